@@ -0,0 +1,616 @@
+"""
+Benchmarks for the data structures in this tutorial.
+
+    python benchmarks.py suite                       # every operation for N = 10^3..10^5
+    python benchmarks.py suite --sizes 1e3,1e5,1e7   # choose the sizes
+    python benchmarks.py suite --save baseline.json  # store the results
+    python benchmarks.py suite --compare baseline.json  # report regressions
+    python benchmarks.py drain | spooler | memory [N]
+    python benchmarks.py startup --budget-ms 50     # import time of each module
+    python benchmarks.py wal                        # cost of the DurableAirport log
+    python benchmarks.py batch                      # batch APIs against one call per item
+    python benchmarks.py wheel                      # pop_due() of the timing wheel against the heap
+    python benchmarks.py build [N]                  # parallel FamilyTree build per number of cores
+"""
+import argparse
+import contextlib
+import csv
+import heapq
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from durable_airport import DurableAirport
+from parallel_build import load_family_tree, save_family_tree_csv
+from linked_list_example import ArrayLinkedList, LinkedList
+from problem_linked_lists_solution import Twitter
+from problem_queues_solution import (Airport_Departures, TimingWheelDepartures, format_departure,
+                                     now_minutes, parse_departure)
+from problem_trees_solution import FamilyTree, PersistentFamilyTree
+from queues_example import Printer, PrinterSpooler
+
+
+def bench_printer_drain():
+    """
+    Fill the Printer queue with N documents and time how long it takes to
+    drain it. With an O(1) dequeue the time per document should stay the
+    same as N grows (linear total time).
+    """
+    print("\nPrinter.drain()")
+    print(f"{'N':>10} {'seconds':>10} {'ns/doc':>10}")
+    for n in (10**3, 10**4, 10**5, 10**6):
+        printer = Printer()
+        printer.enqueue_many((f"doc{i}.txt", "user") for i in range(n))
+
+        start = time.perf_counter()
+        for _ in printer.drain():
+            pass
+        elapsed = time.perf_counter() - start
+
+        print(f"{n:>10} {elapsed:>10.4f} {elapsed / n * 1e9:>10.1f}")
+
+
+def bench_spooler_workers(jobs=2000, delay=0.001):
+    """
+    Send 'jobs' documents through a PrinterSpooler whose sink sleeps for
+    'delay' seconds, like a printer waiting on I/O. While a worker waits,
+    the others keep printing, so throughput should grow with the workers.
+    """
+    def sink(node):
+        time.sleep(delay)
+
+    print(f"\nPrinterSpooler with a {delay * 1000:.0f} ms I/O sink ({jobs} jobs)")
+    print(f"{'workers':>10} {'seconds':>10} {'jobs/s':>10}")
+    for workers in (1, 2, 4, 8, 16):
+        start = time.perf_counter()
+        with PrinterSpooler(sink=sink, workers=workers, max_depth=1000) as spooler:
+            for i in range(jobs):
+                spooler.enqueue_document(f"doc{i}.txt", "user")
+        elapsed = time.perf_counter() - start
+        print(f"{workers:>10} {elapsed:>10.3f} {jobs / elapsed:>10.0f}")
+
+
+def measure_memory(build):
+    """
+    Return the number of bytes still allocated after calling build().
+    The structure returned by build() is kept alive while measuring.
+    """
+    tracemalloc.start()
+    structure = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del structure
+    return size
+
+
+def bench_memory(n=10**6):
+    """
+    Report the memory used per element by each structure holding n
+    elements. The values are small ints shared by every structure (or
+    strings for the tree, which needs unique keys), so the numbers show
+    mostly the overhead of the nodes.
+    """
+    def printer():
+        printer = Printer()
+        printer.enqueue_many((i, None) for i in range(n))
+        return printer
+
+    def airport():
+        airport = Airport_Departures()
+        for i in range(n):
+            airport.enqueue_flight(i, f"01/01/68 {i // 60 % 24:02d}:{i % 60:02d}")
+        return airport
+
+    def linked_list():
+        linked_list = LinkedList()
+        for i in range(n):
+            linked_list.insert_head(i)
+        return linked_list
+
+    def array_linked_list():
+        linked_list = ArrayLinkedList()
+        for i in range(n):
+            linked_list.insert_head(i)
+        return linked_list
+
+    def twitter_thread():
+        thread = Twitter.TwitterThread()
+        for i in range(n):
+            thread.new_thread(i, None)
+        return thread
+
+    names = [f"{i:08d}" for i in range(n)]
+
+    def family_tree():
+        return FamilyTree.from_sorted((name, None) for name in names)
+
+    print(f"\nMemory per element (n={n})")
+    print(f"{'structure':>20} {'bytes/elem':>12}")
+    for name, build in [("Printer", printer), ("Airport_Departures", airport),
+                        ("LinkedList", linked_list), ("ArrayLinkedList", array_linked_list),
+                        ("TwitterThread", twitter_thread), ("FamilyTree", family_tree)]:
+        print(f"{name:>20} {measure_memory(build) / n:>12.1f}")
+
+
+# Benchmark suite
+#
+# Each case is (name, setup, run). setup(n) builds what the case needs and
+# is not timed. run(state, n) performs n operations and is timed.
+
+def _quiet():
+    """
+    Send the messages printed by the structures to /dev/null
+    """
+    return contextlib.redirect_stdout(open(os.devnull, 'w'))
+
+
+def _filled_printer(n):
+    printer = Printer()
+    printer.enqueue_many((f"doc{i}.txt", "user") for i in range(n))
+    return printer
+
+
+def _departures(n, offset=0):
+    """
+    n different departure strings, starting one day from now
+    """
+    first = int(now_minutes()) + 24 * 60 + offset
+    return [format_departure(first + i) for i in range(n)]
+
+
+def _filled_airport(n):
+    airport = Airport_Departures()
+    airport.enqueue_flights(zip(range(n), _departures(n)))
+    return airport
+
+
+def _filled_linked_list(n):
+    linked_list = LinkedList()
+    for i in range(n):
+        linked_list.insert_tail(i)
+    return linked_list
+
+
+def _filled_thread(n):
+    thread = Twitter.TwitterThread()
+    for i in range(n):
+        thread.answer_tweet(i, "user")
+    return thread
+
+
+def _names(n, shuffle):
+    names = [f"{i:08d}" for i in range(n)]
+    if shuffle:
+        random.Random(n).shuffle(names)
+    return names
+
+
+def _filled_tree(n):
+    return FamilyTree.from_sorted((name, "01/01/2000") for name in _names(n, False))
+
+
+def _run_insert_tree(names, n):
+    tree = FamilyTree()
+    for name in names:
+        tree.insert(name, "01/01/2000")
+
+
+def _run_insert_persistent(names, n):
+    tree = PersistentFamilyTree()
+    for name in names:
+        tree = tree.insert(name, "01/01/2000")
+
+
+def _run_dequeue_documents(printer, n):
+    with _quiet():
+        printer.dequeue_documents()
+
+
+def _run_dequeue_flights(airport, n):
+    with _quiet():
+        for _ in range(n):
+            airport.dequeue_flight()
+
+
+def _run_reschedule(state, n):
+    airport, departures = state
+    with _quiet():
+        for code, departure in enumerate(departures):
+            airport.reschedule(code, departure)
+
+
+def _consume(iterable, n):
+    for _ in iterable:
+        pass
+
+
+def _repeat(method, n):
+    for _ in range(n):
+        method()
+
+
+SUITE = [
+    ("Printer.enqueue_document", lambda n: Printer(),
+     lambda printer, n: [printer.enqueue_document(i, "user") for i in range(n)]),
+    ("Printer.dequeue_documents", _filled_printer, _run_dequeue_documents),
+    ("Airport_Departures.enqueue_flight", lambda n: (Airport_Departures(), _departures(n)),
+     lambda state, n: [state[0].enqueue_flight(code, departure) for code, departure in enumerate(state[1])]),
+    ("Airport_Departures.dequeue_flight", _filled_airport, _run_dequeue_flights),
+    ("Airport_Departures.reschedule", lambda n: (_filled_airport(n), _departures(n, offset=n)), _run_reschedule),
+    ("LinkedList.insert_tail", lambda n: LinkedList(),
+     lambda linked_list, n: [linked_list.insert_tail(i) for i in range(n)]),
+    ("LinkedList.insert_head", lambda n: LinkedList(),
+     lambda linked_list, n: [linked_list.insert_head(i) for i in range(n)]),
+    ("LinkedList.extend", lambda n: LinkedList(), lambda linked_list, n: linked_list.extend(range(n))),
+    ("LinkedList.__iter__", _filled_linked_list, _consume),
+    ("LinkedList.rev_l", _filled_linked_list, lambda linked_list, n: linked_list.rev_l()),
+    ("TwitterThread.answer_tweet", lambda n: Twitter.TwitterThread(),
+     lambda thread, n: [thread.answer_tweet(i, "user") for i in range(n)]),
+    ("TwitterThread.extend", lambda n: Twitter.TwitterThread(),
+     lambda thread, n: thread.extend((i, "user") for i in range(n))),
+    ("TwitterThread.__iter__", _filled_thread, _consume),
+    ("FamilyTree.insert (random)", lambda n: _names(n, True), _run_insert_tree),
+    ("FamilyTree.insert (sorted)", lambda n: _names(n, False), _run_insert_tree),
+    ("PersistentFamilyTree.insert (random)", lambda n: _names(n, True), _run_insert_persistent),
+    ("FamilyTree.delete", _filled_tree, lambda tree, n: [tree.delete(name) for name in _names(n, True)]),
+    ("FamilyTree.rename", _filled_tree,
+     lambda tree, n: [tree.rename(name, name + "x") for name in _names(n, True)]),
+    ("FamilyTree.__iter__", _filled_tree, _consume),
+    ("FamilyTree.get_generations", _filled_tree, lambda tree, n: _repeat(tree.get_generations, n)),
+]
+
+
+def time_case(setup, run, n, repeat):
+    """
+    Return the best time of 'repeat' runs of n operations
+    """
+    best = math.inf
+    for _ in range(repeat):
+        state = setup(n)
+        start = time.perf_counter()
+        run(state, n)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def allocations_case(setup, run, n):
+    """
+    Return the peak memory allocated by n operations, in bytes
+    """
+    state = setup(n)
+    tracemalloc.start()
+    run(state, n)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def fit_complexity(points):
+    """
+    Fit time = c * n^b on the (n, seconds) points (least squares on the
+    logarithms) and describe the cost of one operation, which is n^(b - 1).
+    O(1) and O(log n) cannot be told apart on a few sizes, so they share
+    a label.
+    """
+    if len(points) < 2:
+        return "?"
+    xs = [math.log(n) for n, _ in points]
+    ys = [math.log(max(seconds, 1e-9)) for _, seconds in points]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    slope = (sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+             / sum((x - mean_x) ** 2 for x in xs))
+    exponent = slope - 1
+    if exponent < 0.25:
+        label = "O(1)/O(log n)"
+    elif 0.75 < exponent < 1.25:
+        label = "O(n)"
+    else:
+        label = f"O(n^{exponent:.1f})"
+    return f"{label} per op (n^{exponent:+.2f})"
+
+
+def run_suite(sizes, repeat=1, allocations=False, only=None):
+    """
+    Run every case of SUITE for every size. Return a dictionary
+    case -> {n: {'ops_per_sec': ..., 'bytes_per_op': ...}}.
+    """
+    results = {}
+    for name, setup, run in SUITE:
+        if only and only not in name:
+            continue
+        print(f"\n{name}")
+        print(f"{'N':>10} {'ops/s':>14} {'ns/op':>10}" + (f" {'bytes/op':>10}" if allocations else ""))
+        results[name] = {}
+        points = []
+        for n in sizes:
+            seconds = time_case(setup, run, n, repeat)
+            points.append((n, seconds))
+            row = {'ops_per_sec': n / seconds}
+            line = f"{n:>10} {n / seconds:>14,.0f} {seconds / n * 1e9:>10.1f}"
+            if allocations:
+                row['bytes_per_op'] = allocations_case(setup, run, n) / n
+                line += f" {row['bytes_per_op']:>10.1f}"
+            results[name][str(n)] = row
+            print(line)
+        print(f"{'':>10} fitted: {fit_complexity(points)}")
+    return results
+
+
+def compare_results(baseline, results, threshold):
+    """
+    Print the change of ops/s against the baseline. Return the number of
+    measurements slower than the baseline by more than 'threshold' (0.2 = 20%).
+    """
+    regressions = 0
+    print(f"\n{'case':<36} {'N':>10} {'baseline':>14} {'now':>14} {'change':>8}")
+    for name, sizes in results.items():
+        for n, row in sizes.items():
+            old = baseline.get(name, {}).get(n)
+            if old is None:
+                continue
+            change = row['ops_per_sec'] / old['ops_per_sec'] - 1
+            flag = ""
+            if change < -threshold:
+                flag = "  REGRESSION"
+                regressions += 1
+            print(f"{name:<36} {n:>10} {old['ops_per_sec']:>14,.0f} {row['ops_per_sec']:>14,.0f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def bench_wal(n=20000):
+    """
+    Compare enqueue_flight + dequeue_flight on an in-memory Airport_Departures
+    and on a DurableAirport syncing its log with different intervals.
+    fsync after every operation is very slow, so that mode runs a tenth
+    of the operations.
+    """
+    departures = _departures(n)
+
+    def run(airport, count):
+        start = time.perf_counter()
+        with _quiet():
+            for code in range(count):
+                airport.enqueue_flight(str(code), departures[code])
+            for _ in range(count):
+                airport.dequeue_flight()
+        return 2 * count / (time.perf_counter() - start)
+
+    print(f"\nAirport_Departures with and without the operation log ({2 * n} operations)")
+    print(f"{'mode':>28} {'ops/s':>12}")
+    print(f"{'in memory':>28} {run(Airport_Departures(), n):>12,.0f}")
+    for interval in (0, 0.01, 0.1, 1):
+        with tempfile.TemporaryDirectory() as directory:
+            with DurableAirport(os.path.join(directory, "departures"), flush_interval=interval,
+                                batch_size=10**9, compact_every=10**9) as airport:
+                ops = run(airport, n if interval else n // 10)
+        label = f"log, sync every {interval} s" if interval else "log, sync every operation"
+        print(f"{label:>28} {ops:>12,.0f}")
+
+
+def bench_batch(sizes=(10**4, 10**5, 10**6)):
+    """
+    Compare building a LinkedList and a TwitterThread one item at a time
+    with the batch methods (extend / extendleft)
+    """
+    pairs = [
+        ("LinkedList", lambda n: _each(LinkedList().insert_tail, n), "insert_tail",
+         lambda n: LinkedList().extend(range(n)), "extend"),
+        ("LinkedList", lambda n: _each(LinkedList().insert_head, n), "insert_head",
+         lambda n: LinkedList().extendleft(range(n)), "extendleft"),
+        ("TwitterThread", lambda n: _each(Twitter.TwitterThread().answer_tweet, n, "user"), "answer_tweet",
+         lambda n: Twitter.TwitterThread().extend((i, "user") for i in range(n)), "extend"),
+        ("TwitterThread", lambda n: _each(Twitter.TwitterThread().new_thread, n, "user"), "new_thread",
+         lambda n: Twitter.TwitterThread().extendleft((i, "user") for i in range(n)), "extendleft"),
+    ]
+    print("\nBatch methods against one call per item")
+    print(f"{'structure':>14} {'N':>9} {'one by one':>22} {'batch':>22} {'speedup':>8}")
+    for structure, single, single_name, batch, batch_name in pairs:
+        for n in sizes:
+            single_seconds = time_case(lambda n: None, lambda state, n: single(n), n, 3)
+            batch_seconds = time_case(lambda n: None, lambda state, n: batch(n), n, 3)
+            print(f"{structure:>14} {n:>9} {single_name:>12} {single_seconds:>8.3f} s"
+                  f" {batch_name:>12} {batch_seconds:>8.3f} s {single_seconds / batch_seconds:>7.2f}x")
+
+
+def bench_wheel(sizes=(10**4, 10**5, 10**6)):
+    """
+    Release every flight minute by minute: the heap checks its earliest
+    flight and dequeues while it is due, the timing wheel calls pop_due().
+    Half of the flights are rescheduled first, which leaves invalid entries
+    in the heap but costs O(1) in the wheel.
+    """
+    def run(airport, departures):
+        first, last = parse_departure(departures[0]), parse_departure(departures[-1])
+        start = time.perf_counter()
+        with _quiet():
+            for code in range(0, len(departures), 2):
+                airport.reschedule(code, departures[-1 - code])
+            if isinstance(airport, TimingWheelDepartures):
+                for minute in range(first, last + 1):
+                    for _ in airport.pop_due(minute):
+                        pass
+            else:
+                for minute in range(first, last + 1):
+                    while airport.queue:
+                        if airport.queue[0][-1] is None:
+                            heapq.heappop(airport.queue)  # Entry left by reschedule()
+                        elif airport.queue[0][0] <= minute:
+                            airport.dequeue_flight()
+                        else:
+                            break
+        return time.perf_counter() - start
+
+    print("\nDue flights released minute by minute")
+    print(f"{'N':>9} {'heap':>10} {'wheel':>10} {'speedup':>8}")
+    for n in sizes:
+        departures = _departures(n)
+        heap = Airport_Departures()
+        heap.enqueue_flights(zip(range(n), departures))
+        wheel = TimingWheelDepartures()
+        wheel.enqueue_flights(zip(range(n), departures))
+        heap_seconds = run(heap, departures)
+        wheel_seconds = run(wheel, departures)
+        print(f"{n:>9} {heap_seconds:>8.3f} s {wheel_seconds:>8.3f} s {heap_seconds / wheel_seconds:>7.2f}x")
+
+
+def bench_build(n=5 * 10**5):
+    """
+    Build a FamilyTree of n people from a CSV file with insert() and with
+    load_family_tree() for 1, 2, 4, ... workers up to the number of cores,
+    then compare merge() with inserting the people of a second tree.
+    """
+    names = _names(n, True)
+    people = [(name, f"{i % 12 + 1:02d}/{i % 28 + 1:02d}/{1900 + i % 120}") for i, name in enumerate(names)]
+    cores = os.cpu_count() or 1
+    counts = sorted({2**power for power in range(cores.bit_length()) if 2**power <= cores} | {cores})
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "people.csv")
+        save_family_tree_csv(people, path)
+
+        def insert_all():
+            tree = FamilyTree()
+            with open(path, encoding='utf-8', newline='') as file:
+                for name, birthday in csv.reader(file):
+                    tree.insert(name, birthday)
+
+        print(f"\nFamilyTree built from a file of {n} people ({cores} cores)")
+        print(f"{'method':>24} {'seconds':>10} {'vs insert':>10} {'vs 1 worker':>12}")
+        insert_seconds = time_case(lambda n: None, lambda state, n: insert_all(), n, 1)
+        print(f"{'insert()':>24} {insert_seconds:>10.3f} {1:>9.2f}x {'':>12}")
+        one_worker = None
+        for workers in counts:
+            seconds = time_case(lambda n: None, lambda state, n: load_family_tree(path, workers), n, 1)
+            one_worker = one_worker or seconds
+            print(f"{f'load_family_tree({workers})':>24} {seconds:>10.3f}"
+                  f" {insert_seconds / seconds:>9.2f}x {one_worker / seconds:>11.2f}x")
+
+    half = n // 2
+    first = sorted(people[:half])
+    second = FamilyTree.from_sorted(sorted(people[half:]))
+
+    def insert_second(tree):
+        for person in second._traverse_forward(second.root):
+            tree.insert(person.name, person.birthday)
+
+    insert_seconds = time_case(lambda n: FamilyTree.from_sorted(first), lambda tree, n: insert_second(tree), n, 1)
+    merge_seconds = time_case(lambda n: FamilyTree.from_sorted(first), lambda tree, n: tree.merge(second), n, 1)
+    print(f"\nUnion of two trees of {half} people")
+    print(f"{'insert()':>24} {insert_seconds:>10.3f}")
+    print(f"{'merge()':>24} {merge_seconds:>10.3f} {insert_seconds / merge_seconds:>9.2f}x")
+
+
+def _each(method, n, *args):
+    """
+    Call method(i, *args) for i in range(n)
+    """
+    for i in range(n):
+        method(i, *args)
+
+
+STARTUP_MODULES = ['data_structures', 'queues_example', 'problem_queues_solution',
+                   'linked_list_example', 'problem_linked_lists_solution', 'problem_trees_solution']
+
+
+def import_time(module, repeat=5):
+    """
+    Import 'module' in a new interpreter with 'python -X importtime' and
+    return the best cumulative import time in milliseconds
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    best = math.inf
+    for _ in range(repeat):
+        process = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                                 cwd=here, capture_output=True, text=True, check=True)
+        for line in process.stderr.splitlines():
+            # import time: self [us] | cumulative | imported package
+            fields = line.split("|")
+            if len(fields) == 3 and fields[2].strip() == module:
+                best = min(best, int(fields[1]) / 1000)
+    return best
+
+
+def bench_startup(budget_ms):
+    """
+    Report the import time of each module. Return the number of modules
+    slower than the budget.
+    """
+    print(f"\nImport time (budget {budget_ms} ms)")
+    print(f"{'module':>30} {'ms':>8}")
+    over = 0
+    for module in STARTUP_MODULES:
+        milliseconds = import_time(module)
+        flag = ""
+        if milliseconds > budget_ms:
+            flag = "  OVER BUDGET"
+            over += 1
+        print(f"{module:>30} {milliseconds:>8.1f}{flag}")
+    return over
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks for the data structures of this tutorial")
+    commands = parser.add_subparsers(dest="command")
+    suite = commands.add_parser("suite", help="time every operation for several sizes")
+    suite.add_argument("--sizes", default="1e3,1e4,1e5", help="comma separated sizes, for example 1e3,1e5,1e7")
+    suite.add_argument("--repeat", type=int, default=1, help="keep the best of this many runs")
+    suite.add_argument("--allocations", action="store_true", help="also measure the bytes allocated per operation")
+    suite.add_argument("--only", help="run only the cases whose name contains this text")
+    suite.add_argument("--save", help="store the results in this JSON file")
+    suite.add_argument("--compare", help="compare the results with this JSON file")
+    suite.add_argument("--threshold", type=float, default=0.2, help="slowdown reported as a regression (default 0.2)")
+    commands.add_parser("drain", help="Printer.drain() from 10^3 to 10^6 documents")
+    commands.add_parser("spooler", help="PrinterSpooler throughput per number of workers")
+    memory = commands.add_parser("memory", help="bytes per element of each structure")
+    memory.add_argument("n", type=int, nargs="?", default=10**6)
+    commands.add_parser("batch", help="batch APIs against one call per item")
+    commands.add_parser("wal", help="throughput of DurableAirport against the in-memory queue")
+    commands.add_parser("wheel", help="pop_due() of TimingWheelDepartures against the heap")
+    build = commands.add_parser("build", help="parallel FamilyTree build and merge per number of cores")
+    build.add_argument("n", type=int, nargs="?", default=5 * 10**5)
+    startup = commands.add_parser("startup", help="import time of each module (python -X importtime)")
+    startup.add_argument("--budget-ms", type=float, default=50, help="maximum import time of a module")
+    args = parser.parse_args(argv)
+
+    if args.command == "drain":
+        bench_printer_drain()
+    elif args.command == "spooler":
+        bench_spooler_workers()
+    elif args.command == "memory":
+        bench_memory(args.n)
+    elif args.command == "batch":
+        bench_batch()
+    elif args.command == "wal":
+        bench_wal()
+    elif args.command == "wheel":
+        bench_wheel()
+    elif args.command == "build":
+        bench_build(args.n)
+    elif args.command == "startup":
+        if bench_startup(args.budget_ms):
+            return 1
+    elif args.command == "suite":
+        sizes = [int(float(size)) for size in args.sizes.split(",")]
+        results = run_suite(sizes, args.repeat, args.allocations, args.only)
+        if args.save:
+            with open(args.save, "w") as file:
+                json.dump(results, file, indent=2)
+        if args.compare:
+            with open(args.compare) as file:
+                baseline = json.load(file)
+            if compare_results(baseline, results, args.threshold):
+                return 1
+    else:
+        parser.print_help()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+"""
+Single entry point for the data structures of this tutorial:
+
+    from data_structures import Printer, FamilyTree
+
+Each structure lives in its own module and the module is only imported the
+first time one of its names is used (module level __getattr__, PEP 562), so
+importing this module is almost free and a program only pays for what it uses.
+"""
+import importlib
+
+# Name -> module that defines it
+_MODULES = {
+    'Printer': 'queues_example',
+    'FairPrinter': 'queues_example',
+    'PrinterSpooler': 'queues_example',
+    'AsyncPrinter': 'queues_example',
+    'Airport_Departures': 'problem_queues_solution',
+    'TimingWheelDepartures': 'problem_queues_solution',
+    'LinkedList': 'linked_list_example',
+    'ArrayLinkedList': 'linked_list_example',
+    'Twitter': 'problem_linked_lists_solution',
+    'FamilyTree': 'problem_trees_solution',
+    'PersistentFamilyTree': 'problem_trees_solution',
+    'load_family_tree': 'parallel_build',
+    'instrument': 'instrumentation',
+    'uninstrument': 'instrumentation',
+}
+
+__all__ = sorted(_MODULES)
+
+
+def __getattr__(name):
+    """
+    Import the module defining 'name' the first time it is used
+    """
+    module = _MODULES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value  # Next time the name is found without calling __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,290 @@
+"""
+Airport_Departures that survives a crash.
+
+Every change (a flight added, dequeued or rescheduled) is appended to an
+operation log before the method returns. Calling fsync after every line
+would be very slow, so the log is synced in groups ("group commit"): at
+most every 'flush_interval' seconds or every 'batch_size' operations,
+whichever comes first, and always on flush() and close(). A background
+thread syncs the operations still waiting when no new operation comes,
+so a crash can lose at most the last flush_interval seconds of changes.
+
+Every 'compact_every' operations the whole queue is written as a snapshot
+(see snapshots.py) and the log starts again empty, so recovery only has to
+replay the operations made since the last snapshot.
+
+Files used for a queue called 'departures':
+
+    departures.log      first line {"snapshot": N}, then one JSON list per operation
+    departures.N.snap   snapshot number N (N = 0 means no snapshot yet)
+
+The new log is moved over the old one with os.replace(), which is atomic,
+so the log always names a snapshot that exists. The directory is synced
+after each new file or replace so the change itself survives a crash.
+Flight codes must be strings (other codes are refused with TypeError).
+"""
+import json
+import os
+import sys
+import threading
+import time
+
+from problem_queues_solution import Airport_Departures
+from snapshots import AirportSnapshot, save_airport
+
+
+class DurableAirport(Airport_Departures):
+    """
+    Airport_Departures with an operation log. Opening a DurableAirport
+    on existing files recovers the queue as it was at the last sync.
+    """
+    def __init__(self, path, flush_interval=0.05, batch_size=1000, compact_every=100000):
+        """
+        Recover the queue stored at 'path' (without extension) or start an empty one
+        """
+        super().__init__()
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.compact_every = compact_every
+        self.snapshot = 0
+        self.pending = 0       # Operations written but not synced yet
+        self.operations = 0    # Operations since the last snapshot
+        self.last_sync = time.monotonic()
+        self.lock = threading.RLock()  # The log is shared with the flusher thread
+        self._recover()
+        self.log = open(self._log_path(), 'a', encoding='utf-8')
+
+        self.stopped = threading.Event()
+        self.flusher = None
+        if flush_interval > 0:
+            self.flusher = threading.Thread(target=self._flush_periodically, daemon=True)
+            self.flusher.start()
+
+    def _log_path(self):
+        return self.path + '.log'
+
+    def _snapshot_path(self, number):
+        return f"{self.path}.{number}.snap"
+
+    def _sync_directory(self):
+        """
+        Make the files created or replaced in the directory of the queue
+        durable (only possible on POSIX systems)
+        """
+        if os.name != 'posix':
+            return
+        directory = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+
+    def _flush_periodically(self):
+        """
+        Flusher thread: every flush_interval seconds, sync the operations
+        written since the last sync, until close()
+        """
+        while not self.stopped.wait(self.flush_interval):
+            with self.lock:
+                if self.pending and not self.log.closed:
+                    self.flush()
+
+    def _recover(self):
+        """
+        Load the snapshot named by the log, then replay the operations of
+        the log in order. A line cut by a crash at the end is removed from
+        the log, so new operations are not appended to it.
+        """
+        if not os.path.exists(self._log_path()):
+            self._start_log(0)
+            return
+
+        with open(self._log_path(), 'rb+') as log:
+            header = json.loads(log.readline())
+            self.snapshot = header['snapshot']
+            if self.snapshot:
+                with AirportSnapshot(self._snapshot_path(self.snapshot)) as snapshot:
+                    for flight in snapshot:
+                        self._push(flight)
+
+            end = log.tell()  # End of the last complete operation
+            for line in log:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError
+                    operation = json.loads(line)
+                except ValueError:
+                    log.truncate(end)  # Incomplete last line
+                    break
+                self._apply(operation)
+                self.operations += 1
+                end += len(line)
+
+    def _apply(self, operation):
+        """
+        Redo one logged operation without any check or message
+        """
+        kind, code = operation[0], operation[1]
+        if kind == 'E':
+            if code not in self.flights:
+                self._push(Airport_Departures.Flight(code, operation[2]))
+        elif kind == 'D':
+            self._remove(code)
+        elif kind == 'R':
+            flight = self._remove(code)
+            if flight is not None:
+                flight.departure = operation[2]
+                self._push(flight)
+
+    def _remove(self, code):
+        """
+        Take a flight out of the queue by code (its heap entry is invalidated)
+        """
+        entry = self.flights.pop(code, None)
+        if entry is None:
+            return None
+        flight = entry[-1]
+        entry[-1] = None
+        return flight
+
+    def _start_log(self, snapshot):
+        """
+        Replace the log with an empty one that refers to snapshot number 'snapshot'
+        """
+        temporary = self._log_path() + '.tmp'
+        with open(temporary, 'w', encoding='utf-8') as log:
+            log.write(json.dumps({'snapshot': snapshot}) + '\n')
+            log.flush()
+            os.fsync(log.fileno())
+        os.replace(temporary, self._log_path())
+        self._sync_directory()
+        self.snapshot = snapshot
+        self.operations = 0
+
+    def _write(self, *operation):
+        """
+        Append one operation to the log and sync the group if it is due
+        """
+        with self.lock:
+            self.log.write(json.dumps(operation) + '\n')
+            self.pending += 1
+            self.operations += 1
+            if (self.pending >= self.batch_size
+                    or time.monotonic() - self.last_sync >= self.flush_interval):
+                self.flush()
+            if self.operations >= self.compact_every:
+                try:
+                    self.compact()
+                except Exception as error:
+                    # The operation is already applied and logged: report
+                    # the problem and try again after compact_every operations
+                    self.operations = 0
+                    print(f"Compaction of {self.path} failed: {error!r}", file=sys.stderr)
+
+    def flush(self):
+        """
+        Make every operation written so far durable
+        """
+        with self.lock:
+            self.log.flush()
+            os.fsync(self.log.fileno())
+            self.pending = 0
+            self.last_sync = time.monotonic()
+
+    def compact(self):
+        """
+        Write the whole queue as a new snapshot and start an empty log
+        """
+        with self.lock:
+            self.flush()
+            number = self.snapshot + 1
+            save_airport(self, self._snapshot_path(number))
+            with open(self._snapshot_path(number), 'rb+') as snapshot:
+                os.fsync(snapshot.fileno())
+            self._sync_directory()  # The snapshot exists before the log names it
+            self.log.close()
+            try:
+                self._start_log(number)
+            finally:
+                # Same log as before if the new one could not be started
+                self.log = open(self._log_path(), 'a', encoding='utf-8')
+            if number > 1 and os.path.exists(self._snapshot_path(number - 1)):
+                os.remove(self._snapshot_path(number - 1))
+
+    def close(self):
+        """
+        Stop the flusher thread, sync the log and close it
+        """
+        self.stopped.set()
+        if self.flusher is not None:
+            self.flusher.join()
+        with self.lock:
+            if not self.log.closed:
+                self.flush()
+                self.log.close()
+
+    @staticmethod
+    def _check_code(code):
+        """
+        Snapshots can only store string codes: refuse the others before
+        anything is changed
+        """
+        if not isinstance(code, str):
+            raise TypeError(f"DurableAirport flight codes must be strings, not {type(code).__name__}")
+
+    def enqueue_flight(self, code, date_string):
+        """
+        Add a new Flight and log it
+        """
+        self._check_code(code)
+        added = code not in self.flights
+        super().enqueue_flight(code, date_string)
+        if added and code in self.flights:
+            self._write('E', code, self.flights[code][-1].departure)
+
+    def enqueue_flights(self, rows):
+        """
+        Add many flights at once and log the ones added
+        """
+        rows = list(rows)
+        for code, _ in rows:
+            self._check_code(code)
+        candidates = []
+
+        def watch(rows):
+            for code, date_string in rows:
+                if code not in self.flights:
+                    candidates.append(code)
+                yield code, date_string
+
+        added = super().enqueue_flights(watch(rows))
+        for code in dict.fromkeys(candidates):  # Each code once, in order
+            entry = self.flights.get(code)
+            if entry is not None:
+                self._write('E', code, entry[-1].departure)
+        return added
+
+    def dequeue_flight(self):
+        """
+        Dequeue the earliest flight and log it
+        """
+        flight = super().dequeue_flight()
+        if flight is not None:
+            self._write('D', flight.code)
+        return flight
+
+    def reschedule(self, code, date_string):
+        """
+        Change the departure of a flight and log it
+        """
+        entry = self.flights.get(code)
+        super().reschedule(code, date_string)
+        if entry is not None and self.flights.get(code) is not entry:
+            self._write('R', code, self.flights[code][-1].departure)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,223 @@
+"""
+Opt-in metrics for the data structures of this tutorial.
+
+Nothing is measured until instrument() is called on a structure. It wraps
+the methods listed in the 'instrumented_operations' attribute of the
+structure's class, on that object only, so the other objects (and the
+class itself) run the original code with no extra cost:
+
+    printer = Printer()
+    metrics = instrument(printer)
+    printer.enqueue_document('text1.txt', 'Anne')
+    metrics.snapshot()  # {'structure': 'Printer', 'size': 1, ...}
+
+A structure can also define _observe(metrics, operation, args, result),
+called after each instrumented operation, to record its own values with
+metrics.observe() and metrics.gauge().
+
+Only the operations called from outside are counted: when an operation
+calls another instrumented operation of the same structure (for example
+enqueue_many() calling enqueue_document()), the inner call is part of
+the outer one and is not recorded again.
+"""
+import functools
+import inspect
+import time
+
+
+class Histogram():
+    """
+    Distribution of values in power of two buckets. 'scale' converts the
+    value to the unit of the buckets (for example 1e6 for seconds shown
+    in microseconds).
+    """
+    def __init__(self, scale=1):
+        self.scale = scale
+        self.buckets = {}  # Upper bound -> number of values
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def add(self, value):
+        """
+        Count one value
+        """
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        bound = 1 << max(0, int(value * self.scale) - 1).bit_length()
+        self.buckets[bound] = self.buckets.get(bound, 0) + 1
+
+    def snapshot(self):
+        """
+        Return the histogram as a dictionary. The bucket bounds are in the
+        unit of the values multiplied by 'scale'.
+        """
+        return {
+            'scale': self.scale,
+            'count': self.count,
+            'total': self.total,
+            'max': self.max,
+            'buckets': dict(sorted(self.buckets.items())),
+        }
+
+
+class Metrics():
+    """
+    Counters of one instrumented structure
+    """
+    def __init__(self, name):
+        self.name = name
+        self.latency = {}       # Operation -> Histogram of durations (microsecond buckets)
+        self.observations = {}  # Name -> Histogram of values recorded by the structure
+        self.gauges = {}        # Name -> last value recorded by the structure
+        self.marks = {}         # Key -> time, to measure how long something waited
+        self.size = 0
+        self.peak_size = 0
+        self.depth = 0          # Instrumented operations running, to skip the nested calls
+
+    def record(self, operation, seconds, size):
+        """
+        Record one call of an operation and the size of the structure after it
+        """
+        histogram = self.latency.get(operation)
+        if histogram is None:
+            histogram = self.latency[operation] = Histogram(scale=1e6)
+        histogram.add(seconds)
+        self.size = size
+        self.peak_size = max(self.peak_size, size)
+
+    def observe(self, name, value, scale=1):
+        """
+        Add a value to the histogram 'name'
+        """
+        histogram = self.observations.get(name)
+        if histogram is None:
+            histogram = self.observations[name] = Histogram(scale)
+        histogram.add(value)
+
+    def gauge(self, name, value):
+        """
+        Set the current value of 'name'
+        """
+        self.gauges[name] = value
+
+    def mark(self, key):
+        """
+        Remember the current time for 'key'
+        """
+        self.marks[key] = time.perf_counter()
+
+    def elapsed(self, key):
+        """
+        Return the seconds since mark(key) and forget the key, or None if
+        the key was not marked
+        """
+        start = self.marks.pop(key, None)
+        if start is None:
+            return None
+        return time.perf_counter() - start
+
+    def snapshot(self):
+        """
+        Return all the metrics as a dictionary of plain values, ready to be
+        exported (for example as JSON)
+        """
+        return {
+            'structure': self.name,
+            'size': self.size,
+            'peak_size': self.peak_size,
+            'operations': {operation: histogram.snapshot() for operation, histogram in self.latency.items()},
+            'observations': {name: histogram.snapshot() for name, histogram in self.observations.items()},
+            'gauges': dict(self.gauges),
+        }
+
+
+def _wrap(structure, metrics, operation, method):
+    """
+    Return a replacement for a bound method that records its calls.
+    Generators are timed from the first to the last item they give, and
+    recorded when they are exhausted or closed before the end.
+    A call made while another instrumented operation of the structure is
+    running is nested in it and runs the original method directly.
+    """
+    observe = getattr(structure, '_observe', None)
+
+    def done(args, result, start):
+        metrics.record(operation, time.perf_counter() - start, len(structure))
+        if observe is not None:
+            observe(metrics, operation, args, result)
+
+    if inspect.isgeneratorfunction(method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            if metrics.depth:
+                yield from method(*args, **kwargs)
+                return
+            start = time.perf_counter()
+            count = 0
+            items = method(*args, **kwargs)
+            try:
+                while True:
+                    # Only the code of the generator is inside the operation,
+                    # not the code of the caller between two items
+                    metrics.depth += 1
+                    try:
+                        item = next(items)
+                    except StopIteration:
+                        break
+                    finally:
+                        metrics.depth -= 1
+                    count += 1
+                    yield item
+            except GeneratorExit:
+                # The caller stopped early (or the generator was collected):
+                # the items given so far are still one operation
+                items.close()
+                done(args, count, start)
+                raise
+            done(args, count, start)
+    else:
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            if metrics.depth:
+                return method(*args, **kwargs)
+            start = time.perf_counter()
+            metrics.depth += 1
+            try:
+                result = method(*args, **kwargs)
+            finally:
+                metrics.depth -= 1
+            done(args, result, start)
+            return result
+    return wrapper
+
+
+def instrument(structure, name=None):
+    """
+    Start collecting metrics on 'structure' and return its Metrics object.
+    Calling it again on the same structure returns the same Metrics.
+    """
+    metrics = structure.__dict__.get('metrics')
+    if metrics is not None:
+        return metrics
+
+    metrics = Metrics(name or type(structure).__qualname__)
+    for operation in type(structure).instrumented_operations:
+        method = getattr(structure, operation)
+        setattr(structure, operation, _wrap(structure, metrics, operation, method))
+    structure.metrics = metrics
+    metrics.size = metrics.peak_size = len(structure)
+    return metrics
+
+
+def uninstrument(structure):
+    """
+    Stop collecting metrics on 'structure' and return the last Metrics
+    (or None if the structure was not instrumented)
+    """
+    metrics = structure.__dict__.pop('metrics', None)
+    if metrics is not None:
+        for operation in type(structure).instrumented_operations:
+            structure.__dict__.pop(operation, None)
+    return metrics
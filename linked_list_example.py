@@ -3,14 +3,27 @@ Example Problem Linked Lists
 How to Reverse a List
 """
 
-class LinkedList:
+from array import array
+
+from rendering import Renderable
+
+_MISSING = object()  # Default of insert_after(), so that None can be inserted
+
+
+class LinkedList(Renderable):
     """
     LinkedList class to implement the data structure. The purpose of this example is to show how to reverse a Linked List
     """
+    render_open = "linkedlist["
+    instrumented_operations = ('insert_head', 'insert_tail', 'insert_after', 'remove', 'move_to_front',
+                               'extend', 'extendleft', 'splice', 'rev_l', 'reverse')
+
     class Node:
         """
         Create the structure for a Node
         """
+        __slots__ = ('data', 'next', 'prev')
+
         def __init__(self, data):
             """
             Initialized the Node to the data provided
@@ -21,98 +34,350 @@ class LinkedList:
         
     def __init__(self):
         """
-        Initiliaze an empty linked list
+        Initiliaze an empty linked list. The 'nodes' dictionary maps each
+        value to the list of Nodes holding it, in the order of the linked
+        list, so a value (its first occurrence) can be found without
+        walking the list. Values must therefore be hashable.
         """
         self.head = None
         self.tail = None
-        self.reversed_list = list()
-    
-    def insert_head(self, value):
+        self.nodes = {}
+        self.size = 0
+
+    def _register(self, node, first=False):
         """
-        Insert a new Node as the head of the list
+        Add the node to the value index, as the last occurrence of its
+        value (or the first one if 'first' is True)
         """
-        new_node = LinkedList.Node(value)
+        same_value = self.nodes.get(node.data)
+        if same_value is None:
+            self.nodes[node.data] = [node]
+        elif first:
+            same_value.insert(0, node)
+        else:
+            same_value.append(node)
+        self.size += 1
 
+    def _register_after(self, node):
+        """
+        Add a node just linked in the middle of the list to the value
+        index. Its place among the other occurrences of its value is found
+        by walking the list to the next occurrence, so this is only slower
+        than O(1) for a value that is repeated.
+        """
+        same_value = self.nodes.get(node.data)
+        if same_value is None:
+            self.nodes[node.data] = [node]
+            self.size += 1
+            return
+        following = node.next
+        while following is not None and following.data != node.data:
+            following = following.next
+        if following is None:
+            same_value.append(node)
+        else:
+            same_value.insert(same_value.index(following), node)
+        self.size += 1
+
+    def _unregister(self, node):
+        """
+        Remove the node from the value index
+        """
+        same_value = self.nodes[node.data]
+        if same_value[0] is node:
+            del same_value[0]
+        else:
+            same_value.remove(node)  # Only when the value is repeated
+        if not same_value:
+            del self.nodes[node.data]
+        self.size -= 1
+
+    def find(self, value):
+        """
+        Return the first Node holding value (from the head of the list)
+        or None if the value is not in the list
+        """
+        same_value = self.nodes.get(value)
+        if same_value is None:
+            return None
+        return same_value[0]
+
+    def _link_head(self, node):
+        """
+        Link an unlinked node at the head of the list
+        """
         # Case 1 - List is empty
         if self.head == None:
-            self.head = new_node
-            self.tail = new_node
+            self.head = node
+            self.tail = node
 
         # Case 2 - List is not empty
         else:
-            new_node.next = self.head
-            self.head.prev = new_node
-            self.head = new_node
+            node.next = self.head
+            self.head.prev = node
+            self.head = node
 
-    def insert_tail(self, value):
+    def _link_tail(self, node):
         """
-        Insert a new Node at the tail of the list
+        Link an unlinked node at the tail of the list
         """
-        new_node = LinkedList.Node(value)
-
         # Case 1 - List is empty
         if self.tail == None and self.head == None:
-            self.head = new_node
-            self.tail = new_node
+            self.head = node
+            self.tail = node
 
         # Case 2 - List is not empty
-        new_node.prev = self.tail
-        self.tail.next = new_node
-        self.tail = new_node
+        else:
+            node.prev = self.tail
+            self.tail.next = node
+            self.tail = node
 
-    def insert_after(self, value):
+    def _unlink(self, node):
         """
-        Insert new_value after the occurrence of value in the linked list
+        Take the node out of the list, connecting its neighbours together
         """
-        # Start searching at the head of the list
-        current = self.head
-        while current is not None:
-            if current.data == value:
-                # Check if the value is the tail
-                # If so user the 'insert_tail() method'
-                if current == self.tail:
-                    self.insert_tail(value)
-                # Insert the value in the middle of the list
-                else:
-                    new_node = LinkedList.Node(value)
-                    new_node.prev = current
-                    new_node.next = current.next
-                    current.next.prev = new_node
-                    current.next = new_node
-                return
-            # Check the next value in the list
-            current = current.next
+        if node.prev is None:
+            self.head = node.next
+        else:
+            node.prev.next = node.next
+
+        if node.next is None:
+            self.tail = node.prev
+        else:
+            node.next.prev = node.prev
+
+        node.prev = None
+        node.next = None
     
-    def rev_l(self):
+    def insert_head(self, value):
         """
-        Return the reversed linked list
+        Insert a new Node as the head of the list and return it
         """
-        # Set the current Node to the tail
-        current = self.tail
-        
-        # Iterate over the list from the tail to the head
-        while current is not None:
-            # Append the value to the list
-            self.reversed_list.append(current.data)
-            # Set current to the previous node
-            current = current.prev
+        new_node = LinkedList.Node(value)
+        self._link_head(new_node)
+        self._register(new_node, first=True)
+        return new_node
+
+    def insert_tail(self, value):
+        """
+        Insert a new Node at the tail of the list and return it
+        """
+        new_node = LinkedList.Node(value)
+        self._link_tail(new_node)
+        self._register(new_node)
+        return new_node
+
+    def insert_after(self, value, new_value=_MISSING):
+        """
+        Insert new_value after the first occurrence of value in the linked
+        list and return the new Node. If new_value is not provided, value
+        is inserted again. Nothing happens if value is not in the list.
+        """
+        if new_value is _MISSING:
+            new_value = value
+
+        # Use the index instead of searching from the head of the list
+        current = self.find(value)
+        if current is None:
+            return None
+
+        new_node = LinkedList.Node(new_value)
+        # Check if the value is the tail
+        # If so link the node as the new tail
+        if current == self.tail:
+            self._link_tail(new_node)
+        # Insert the value in the middle of the list
+        else:
+            new_node.prev = current
+            new_node.next = current.next
+            current.next.prev = new_node
+            current.next = new_node
+        self._register_after(new_node)
+        return new_node
+
+    def remove(self, value):
+        """
+        Remove the first occurrence of value from the linked list. Return True if
+        a Node was removed and False if the value is not in the list.
+        """
+        node = self.find(value)
+        if node is None:
+            return False
+        self._unlink(node)
+        self._unregister(node)
+        return True
+
+    def move_to_front(self, value):
+        """
+        Move the first occurrence of value to the head of the list. This is what a
+        LRU cache does every time an item is used. Return True if the value
+        was found.
+        """
+        node = self.find(value)
+        if node is None:
+            return False
+        if node is not self.head:
+            self._unlink(node)
+            self._link_head(node)
+            # Already the first occurrence of its value, the index is unchanged
+        return True
+
+    @classmethod
+    def from_iterable(cls, values):
+        """
+        Create a linked list holding the values in the same order
+        """
+        linked_list = cls()
+        linked_list.extend(values)
+        return linked_list
+
+    def extend(self, values):
+        """
+        Insert all the values at the tail, in order. The Nodes are linked
+        to each other in one loop and the list is updated once at the end.
+        """
+        Node = LinkedList.Node
+        nodes = self.nodes
+        first = last = None
+        count = 0
+        for value in values:
+            new_node = Node(value)
+            if last is None:
+                first = new_node
+            else:
+                new_node.prev = last
+                last.next = new_node
+            last = new_node
+            same_value = nodes.get(value)
+            if same_value is None:
+                nodes[value] = [new_node]
+            else:
+                same_value.append(new_node)
+            count += 1
+
+        if first is None:
+            return
+        if self.tail is None:
+            self.head = first
+        else:
+            first.prev = self.tail
+            self.tail.next = first
+        self.tail = last
+        self.size += count
 
-        # Return the list
-        return self.reversed_list
-    def __str__(self):
+    def extendleft(self, values):
         """
-        Returns a string representation of the object
+        Insert all the values at the head, one after the other (like
+        deque.extendleft, the values end up in reverse order)
         """
-        output = "linkedlist["
-        first = True
-        for value in self:
-            if first:
-                first = False
+        Node = LinkedList.Node
+        added = {}  # value -> new Nodes, in the order they were created
+        first = last = None
+        count = 0
+        for value in values:
+            new_node = Node(value)
+            if first is None:
+                last = new_node
             else:
-                output += ", "
-            output += str(value)
-        output += "]"
-        return output
+                new_node.next = first
+                first.prev = new_node
+            first = new_node
+            same_value = added.get(value)
+            if same_value is None:
+                added[value] = [new_node]
+            else:
+                same_value.append(new_node)
+            count += 1
+
+        # The new Nodes come before the old ones, the last created first
+        nodes = self.nodes
+        for value, same_value in added.items():
+            same_value.reverse()
+            old = nodes.get(value)
+            if old is not None:
+                same_value.extend(old)
+            nodes[value] = same_value
+
+        if first is None:
+            return
+        if self.head is None:
+            self.tail = last
+        else:
+            last.next = self.head
+            self.head.prev = last
+        self.head = first
+        self.size += count
+
+    def splice(self, other):
+        """
+        Move all the Nodes of 'other' to the end of this list, leaving
+        'other' empty. Linking the two lists is O(1); the value index of
+        the smaller list is merged into the bigger one.
+        """
+        if other is self or other.head is None:
+            return
+        if self.head is None:
+            self.head = other.head
+        else:
+            self.tail.next = other.head
+            other.head.prev = self.tail
+        self.tail = other.tail
+
+        # The Nodes of this list come before the Nodes of 'other'
+        small, big = other.nodes, self.nodes
+        small_first = len(small) > len(big)
+        if small_first:
+            small, big = big, small
+        for value, same_value in small.items():
+            if value not in big:
+                big[value] = same_value
+            elif small_first:
+                big[value][:0] = same_value
+            else:
+                big[value].extend(same_value)
+        self.nodes = big
+        self.size += other.size
+
+        other.head = None
+        other.tail = None
+        other.nodes = {}
+        other.size = 0
+
+    def __len__(self):
+        """
+        Support the len() function
+        """
+        return self.size
+
+    def __contains__(self, value):
+        """
+        Support the 'in' operator
+        """
+        return value in self.nodes
+    
+    def rev_l(self):
+        """
+        Return the reversed linked list as a new Python list. Nothing is
+        kept in the object, so calling it again gives the same result.
+        To walk the list backwards without building a list use reversed().
+        """
+        return list(reversed(self))
+
+    def reverse(self):
+        """
+        Reverse the linked list in place by swapping the next and prev
+        pointers of every Node, then swapping the head and the tail.
+        No Node is created, so this uses no extra memory.
+        """
+        current = self.head
+        while current is not None:
+            current.next, current.prev = current.prev, current.next
+            # The old next Node is now in prev
+            current = current.prev
+        self.head, self.tail = self.tail, self.head
+        for same_value in self.nodes.values():
+            same_value.reverse()
+
     def __iter__(self):
         """
         Iterate forward through the Linked List
@@ -126,14 +391,203 @@ class LinkedList:
             # Go to the next Node
             current = current.next
 
+    def __reversed__(self):
+        """
+        Iterate backward through the Linked List, from the tail to the head.
+        No copy of the list is made.
+        """
+        # Start at the end of the list
+        current = self.tail
+        while current is not None:
+            yield current.data
+            # Go to the previous Node
+            current = current.prev
+
+
+class ArrayLinkedList(Renderable):
+    """
+    Same doubly linked list as LinkedList, but stored as a "struct of
+    arrays": instead of one Node object per value, node number i keeps
+    its value in values[i] and its links in next[i] and prev[i]. The
+    links are integers in typed arrays (8 bytes each) and -1 means None.
+    This uses a fraction of the memory of separate Node objects.
+
+    Only the linked list has this storage; the other structures use
+    slotted node objects. There is no value index like LinkedList.nodes
+    (it would cost the memory saved), so insert_after(), remove() and
+    'in' walk the list from the head: O(n).
+    """
+    render_open = "linkedlist["
+    NONE = -1
+
+    def __init__(self):
+        """
+        Initialize an empty linked list
+        """
+        self.values = []
+        self.next = array('q')
+        self.prev = array('q')
+        self.free = array('q')  # Indexes of removed nodes, reused first
+        self.head = ArrayLinkedList.NONE
+        self.tail = ArrayLinkedList.NONE
+        self.size = 0
+
+    def _new_node(self, value):
+        """
+        Create a node with no links and return its index
+        """
+        self.size += 1
+        if self.free:
+            node = self.free.pop()
+            self.values[node] = value
+            self.next[node] = ArrayLinkedList.NONE
+            self.prev[node] = ArrayLinkedList.NONE
+            return node
+        self.values.append(value)
+        self.next.append(ArrayLinkedList.NONE)
+        self.prev.append(ArrayLinkedList.NONE)
+        return len(self.values) - 1
+
+    def _find(self, value):
+        """
+        Return the index of the first node holding value, or NONE
+        """
+        for i in self._walk(self.head, self.next):
+            if self.values[i] == value:
+                return i
+        return ArrayLinkedList.NONE
+
+    def insert_head(self, value):
+        """
+        Insert a new node as the head of the list
+        """
+        new_node = self._new_node(value)
+
+        # Case 1 - List is empty
+        if self.head == ArrayLinkedList.NONE:
+            self.head = new_node
+            self.tail = new_node
+
+        # Case 2 - List is not empty
+        else:
+            self.next[new_node] = self.head
+            self.prev[self.head] = new_node
+            self.head = new_node
+
+    def insert_tail(self, value):
+        """
+        Insert a new node at the tail of the list
+        """
+        new_node = self._new_node(value)
+
+        # Case 1 - List is empty
+        if self.tail == ArrayLinkedList.NONE:
+            self.head = new_node
+            self.tail = new_node
+
+        # Case 2 - List is not empty
+        else:
+            self.prev[new_node] = self.tail
+            self.next[self.tail] = new_node
+            self.tail = new_node
+
+    def insert_after(self, value, new_value=_MISSING):
+        """
+        Insert new_value after the first occurrence of value. If new_value
+        is not provided, value is inserted again. Return True if value was
+        found.
+        """
+        if new_value is _MISSING:
+            new_value = value
+        current = self._find(value)
+        if current == ArrayLinkedList.NONE:
+            return False
+
+        if current == self.tail:
+            self.insert_tail(new_value)
+        else:
+            new_node = self._new_node(new_value)
+            following = self.next[current]
+            self.prev[new_node] = current
+            self.next[new_node] = following
+            self.prev[following] = new_node
+            self.next[current] = new_node
+        return True
+
+    def remove(self, value):
+        """
+        Remove the first occurrence of value. Return True if a node was
+        removed and False if the value is not in the list.
+        """
+        node = self._find(value)
+        if node == ArrayLinkedList.NONE:
+            return False
+
+        previous, following = self.prev[node], self.next[node]
+        if previous == ArrayLinkedList.NONE:
+            self.head = following
+        else:
+            self.next[previous] = following
+        if following == ArrayLinkedList.NONE:
+            self.tail = previous
+        else:
+            self.prev[following] = previous
+
+        self.values[node] = None  # Do not keep the value alive
+        self.free.append(node)
+        self.size -= 1
+        return True
+
+    def __contains__(self, value):
+        """
+        Support the 'in' operator
+        """
+        return self._find(value) != ArrayLinkedList.NONE
+
+    def rev_l(self):
+        """
+        Return the reversed linked list
+        """
+        return [self.values[i] for i in self._walk(self.tail, self.prev)]
+
+    def _walk(self, current, links):
+        """
+        Give the indexes of the nodes starting at 'current' and following
+        the 'links' array (next or prev)
+        """
+        while current != ArrayLinkedList.NONE:
+            yield current
+            current = links[current]
+
+    def __len__(self):
+        """
+        Support the len() function
+        """
+        return self.size
+
+    def __reversed__(self):
+        """
+        Iterate backward through the Linked List
+        """
+        for i in self._walk(self.tail, self.prev):
+            yield self.values[i]
+
+    def __iter__(self):
+        """
+        Iterate forward through the Linked List
+        """
+        for i in self._walk(self.head, self.next):
+            yield self.values[i]
+
 
 # Test Cases
-my_ll = LinkedList()
-my_ll.insert_head(9) 
-my_ll.insert_head(7) 
-my_ll.insert_head(5) 
-my_ll.insert_tail(3) 
-my_ll.insert_tail(1) 
-my_ll.insert_tail(0) 
-print(my_ll)
-print(my_ll.rev_l())
+if __name__ == "__main__":
+    my_ll = LinkedList()
+    my_ll.insert_head(9)
+    my_ll.insert_head(7)
+    my_ll.insert_head(5)
+    my_ll.insert_tail(3)
+    my_ll.insert_tail(1)
+    my_ll.insert_tail(0)
+    print(my_ll)
+    print(my_ll.rev_l())
@@ -0,0 +1,102 @@
+"""
+Build a FamilyTree from a large file of people using several processes.
+
+The file has one person per line, 'name,birthday' (CSV, the birthday may
+be empty). Inserting millions of people one by one with FamilyTree.insert
+runs on one core and pays for a search and some rotations per person.
+Here the work is split in three steps:
+
+    1. The file is cut into shards of about the same number of bytes.
+       Each process of a ProcessPoolExecutor reads its own shard from the
+       file (only the results travel between the processes), parses the
+       lines and sorts them by name.
+    2. The sorted shards are merged into one sorted stream (k-way merge
+       with heapq.merge).
+    3. FamilyTree.from_sorted builds the balanced tree from the stream in
+       O(n), without any search or rotation.
+
+    tree = load_family_tree('people.csv', workers=4)
+
+When a name appears more than once the first line wins, like insert().
+"""
+import csv
+import heapq
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from problem_trees_solution import FamilyTree
+
+
+def _read_shard(path, start, end):
+    """
+    Parse the lines starting between byte 'start' and byte 'end' of the
+    file and return them as (name, line number in the shard, birthday)
+    sorted by name. A line cut by 'start' belongs to the previous shard.
+    """
+    with open(path, 'rb') as file:
+        if start > 0:
+            file.seek(start - 1)
+            file.readline()  # Skip to the first line starting at or after 'start'
+        lines = []
+        while file.tell() < end:
+            line = file.readline()
+            if not line:
+                break
+            lines.append(line.decode('utf-8'))
+
+    people = []
+    for number, row in enumerate(csv.reader(lines)):
+        if row:
+            # The line number keeps the first of two equal names first
+            people.append((row[0], number, row[1] if len(row) > 1 and row[1] else None))
+    people.sort()
+    return people
+
+
+def _shards(path, count):
+    """
+    Cut the file into 'count' byte ranges of about the same size
+    """
+    size = os.path.getsize(path)
+    bounds = [size * index // count for index in range(count + 1)]
+    return list(zip(bounds, bounds[1:]))
+
+
+def load_family_tree(path, workers=None, shards=None):
+    """
+    Build a FamilyTree from a 'name,birthday' file with 'workers'
+    processes (all the cores by default). The file is cut into 'shards'
+    pieces (four per worker by default, so a slow shard does not keep the
+    other workers waiting). With workers=1 everything runs in this
+    process, which is still much faster than insert().
+    """
+    workers = workers or os.cpu_count() or 1
+    ranges = _shards(path, shards or 4 * workers)
+    if workers == 1:
+        sorted_shards = [_read_shard(path, start, end) for start, end in ranges]
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            sorted_shards = list(executor.map(_read_shard, [path] * len(ranges),
+                                              *zip(*ranges)))
+
+    streams = [_tagged(shard, index) for index, shard in enumerate(sorted_shards)]
+    return FamilyTree.from_sorted((name, birthday) for name, _, _, birthday in heapq.merge(*streams))
+
+
+def _tagged(shard, index):
+    """
+    Add the shard number to each person of a sorted shard. It breaks the
+    ties between shards, so the first line of the file wins.
+    """
+    for name, number, birthday in shard:
+        yield name, index, number, birthday
+
+
+def save_family_tree_csv(people, path):
+    """
+    Write (name, birthday) pairs in the format read by load_family_tree()
+    """
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.writer(file)
+        for name, birthday in people:
+            writer.writerow((name, '' if birthday is None else birthday))
@@ -1,3 +1,10 @@
+import bisect
+import heapq
+import itertools
+from collections import deque
+
+from rendering import Renderable
+
 # Initialize the main Twitter class
 
 class Twitter():
@@ -5,19 +12,31 @@ class Twitter():
     The Twitter class create a Twitter-like object that allows the user to write a tweet, create a tweeter thread, and have answers connected cascading down from the first tweet.
     """
 
-    class TwitterThread():
+    class TwitterThread(Renderable):
         """
         Create the structure of a Twitter thread as a linked list
         """
+        render_open = "twitter-thread["
+        instrumented_operations = ('new_thread', 'answer_tweet', 'extend', 'extendleft', 'splice')
+
         class Tweet():
             """
             Create the structure of the Tweet. It will have a string with the tweet, the pointer to the next tweet, and the pointer to the previous tweet.
+            Every tweet also gets a unique id, a pointer to the tweet it
+            answers (parent) and the list of its answers (children), so the
+            answers form a tree inside the thread.
             """
+            __slots__ = ('next', 'prev', 'tweet', 'username', 'id', 'parent', 'children')
+            ids = itertools.count(1)  # Shared by all the tweets, so ids are unique
+
             def __init__(self, data:str, username):
                 self.next = None
                 self.prev = None
                 self.tweet  = data
                 self.username = username
+                self.id = next(Twitter.TwitterThread.Tweet.ids)
+                self.parent = None
+                self.children = None  # List created with the first answer
 
             def __str__(self):
                 """
@@ -27,12 +46,40 @@ class Twitter():
 
         def __init__(self):
             """
-            Initialize the Twitter object as a linked list
+            Initialize the Twitter object as a linked list. The linked list
+            keeps the tweets in the order they were written, and 'tweets'
+            maps each id to its Tweet.
             """
             self.head = None
             self.tail = None
+            self.size = 0
+            self.tweets = {}
+            self.twitter = None  # The Twitter object holding this thread, if any
+            # The thread only grows at its ends, so the position of a tweet
+            # never changes relative to its neighbours. 'front' holds the
+            # tweets added by new_thread (last added = first of the thread)
+            # and 'back' the others, which gives O(1) access by position.
+            # Tweet ids grow with time, so both lists are sorted by id.
+            self.front = []
+            self.back = []
+            # Parts of those lists sorted by id, as (list, start, end), used
+            # by Twitter.feed(). end is None for a part that is still growing.
+            self.runs = [(self.front, 0, None), (self.back, 0, None)]
+
+        def _register(self, new_tweet):
+            """
+            Index the tweet by id (here and in the Twitter object)
+            """
+            self.tweets[new_tweet.id] = new_tweet
+            if self.twitter is not None:
+                self.twitter.threads[new_tweet.id] = self
+            self.size += 1
         
         def new_thread(self, tweet, username):
+            """
+            Add a tweet at the beginning of the thread and return it. The
+            previous first tweet becomes an answer to the new one.
+            """
             new_tweet = Twitter.TwitterThread.Tweet(tweet, username)
 
             # Case 1 - List is empty
@@ -44,9 +91,30 @@ class Twitter():
             else:
                 new_tweet.next = self.head
                 self.head.prev = new_tweet
+                self.head.parent = new_tweet
+                new_tweet.children = [self.head]
                 self.head = new_tweet
 
-        def answer_tweet(self, tweet, username):
+            if self.size == 0:
+                self.back.append(new_tweet)
+            else:
+                self.front.append(new_tweet)
+            self._register(new_tweet)
+            return new_tweet
+
+        def answer_tweet(self, tweet, username, reply_to=None):
+            """
+            Add an answer at the end of the thread and return it. By default
+            it answers the last tweet; 'reply_to' is the id of any tweet of
+            the thread to answer instead. Both cases are O(1).
+            """
+            if reply_to is None:
+                parent = self.tail
+            else:
+                parent = self.tweets.get(reply_to)
+                if parent is None:
+                    raise KeyError(f"No tweet with id {reply_to} in this thread")
+
             new_tweet = Twitter.TwitterThread.Tweet(tweet, username)
 
             # Case 1 - List is empty
@@ -55,24 +123,227 @@ class Twitter():
                 self.tail = new_tweet
 
             # Case 2 - List is not empty
-            new_tweet.prev = self.tail
-            self.tail.next = new_tweet
-            self.tail = new_tweet
-        
-        def __str__(self):
+            else:
+                new_tweet.prev = self.tail
+                self.tail.next = new_tweet
+                self.tail = new_tweet
+
+            if parent is not None:
+                new_tweet.parent = parent
+                if parent.children is None:
+                    parent.children = []
+                parent.children.append(new_tweet)
+
+            self.back.append(new_tweet)
+            self._register(new_tweet)
+            return new_tweet
+
+        @classmethod
+        def from_iterable(cls, tweets):
             """
-            Graphical representation of a twitter thread
+            Create a thread from (tweet, username) pairs, each one answering
+            the previous one
             """
-            output = "twitter-thread["
-            first = True
-            for value in self:
-                if first:
-                    first = False
-                else:
-                    output += ", "
-                output += str(value)
-            output += "]"
-            return output    
+            thread = cls()
+            thread.extend(tweets)
+            return thread
+
+        def _index_batch(self, batch):
+            """
+            Index a batch of new tweets by id
+            """
+            tweets = self.tweets
+            for new_tweet in batch:
+                tweets[new_tweet.id] = new_tweet
+            if self.twitter is not None:
+                self.twitter.threads.update((new_tweet.id, self) for new_tweet in batch)
+            self.size += len(batch)
+
+        def extend(self, tweets):
+            """
+            Add (tweet, username) pairs at the end of the thread, each one
+            answering the previous one (like calling answer_tweet for each
+            pair). The tweets are linked to each other in one loop.
+            """
+            Tweet = Twitter.TwitterThread.Tweet
+            batch = []
+            last = self.tail
+            for data, username in tweets:
+                new_tweet = Tweet(data, username)
+                if last is not None:
+                    new_tweet.prev = last
+                    last.next = new_tweet
+                    new_tweet.parent = last
+                    if last.children is None:
+                        last.children = [new_tweet]
+                    else:
+                        last.children.append(new_tweet)
+                last = new_tweet
+                batch.append(new_tweet)
+
+            if not batch:
+                return
+            if self.head is None:
+                self.head = batch[0]
+            self.tail = last
+            self.back.extend(batch)
+            self._index_batch(batch)
+
+        def extendleft(self, tweets):
+            """
+            Add (tweet, username) pairs at the beginning of the thread (like
+            calling new_thread for each pair, so they end up in reverse order)
+            """
+            Tweet = Twitter.TwitterThread.Tweet
+            batch = []
+            first = self.head
+            for data, username in tweets:
+                new_tweet = Tweet(data, username)
+                if first is not None:
+                    new_tweet.next = first
+                    first.prev = new_tweet
+                    first.parent = new_tweet
+                    new_tweet.children = [first]
+                first = new_tweet
+                batch.append(new_tweet)
+
+            if not batch:
+                return
+            if self.tail is None:
+                self.tail = batch[0]
+                self.back.append(batch[0])
+                batch_front = batch[1:]
+            else:
+                batch_front = batch
+            self.head = first
+            self.front.extend(batch_front)
+            self._index_batch(batch)
+
+        def splice(self, other):
+            """
+            Move all the tweets of 'other' to the end of this thread, leaving
+            'other' empty. The first tweet of 'other' becomes an answer to
+            the last tweet of this thread. Linking the threads is O(1);
+            moving the id indexes and positions is O(len(other)).
+            """
+            if other is self or other.head is None:
+                return
+
+            if self.tail is None:
+                self.head = other.head
+            else:
+                self.tail.next = other.head
+                other.head.prev = self.tail
+                other.head.parent = self.tail
+                if self.tail.children is None:
+                    self.tail.children = []
+                self.tail.children.append(other.head)
+            self.tail = other.tail
+
+            # Close the growing part of 'back', add the parts of 'other'
+            # (those in other.back move with it), and start a new part
+            back, start, _ = self.runs[-1]
+            self.runs[-1] = (back, start, len(self.back))
+            offset = len(self.back) + len(other.front)
+            for run, first, last in other.runs:
+                if run is other.back:
+                    end = len(run) if last is None else last
+                    self.runs.append((self.back, offset + first, offset + end))
+                elif first != (len(run) if last is None else last):
+                    self.runs.append((run, first, last))
+            self.back.extend(reversed(other.front))
+            self.back.extend(other.back)
+            self.runs.append((self.back, len(self.back), None))
+
+            self.tweets.update(other.tweets)
+            if other.twitter is not None:
+                for tweet_id in other.tweets:
+                    del other.twitter.threads[tweet_id]
+            if self.twitter is not None:
+                self.twitter.threads.update(dict.fromkeys(other.tweets, self))
+            self.size += other.size
+
+            twitter = other.twitter
+            other.__init__()
+            other.twitter = twitter
+
+        def get_tweet(self, tweet_id):
+            """
+            Return the Tweet with the given id, or None
+            """
+            return self.tweets.get(tweet_id)
+
+        def seek(self, offset:int):
+            """
+            Return the tweet at position 'offset' (starting from 0) in O(1)
+            """
+            if offset < 0 or offset >= self.size:
+                raise IndexError("TwitterThread index out of range")
+            if offset < len(self.front):
+                return self.front[len(self.front) - 1 - offset]
+            return self.back[offset - len(self.front)]
+
+        def iter_from(self, cursor=None, limit=None):
+            """
+            Give the Tweets starting at the tweet 'cursor' (a tweet id, the
+            beginning of the thread if None) for at most 'limit' tweets.
+            A cursor stays valid while the thread grows.
+            """
+            current = self.head if cursor is None else self.tweets.get(cursor)
+            count = 0
+            while current is not None and (limit is None or count < limit):
+                yield current
+                current = current.next
+                count += 1
+
+        def page(self, cursor=None, n=20, offset=None):
+            """
+            Return a page of at most n Tweets and the cursor of the next page
+            (None after the last page). The page starts at 'cursor', or at
+            position 'offset' of the thread, found in O(1) with seek().
+            """
+            if offset is not None:
+                if offset >= self.size:
+                    return [], None
+                cursor = self.seek(offset).id
+            tweets = list(self.iter_from(cursor, n))
+            if not tweets or tweets[-1].next is None:
+                return tweets, None
+            return tweets, tweets[-1].next.id
+
+        def _runs(self):
+            """
+            The tweets of the thread as (list, start, end) parts sorted by
+            id (= by time)
+            """
+            return [(run, start, len(run) if end is None else end) for run, start, end in self.runs]
+
+        def replies(self, tweet_id, breadth_first=False):
+            """
+            Give the tweet with the given id and all the answers below it.
+            By default the order is depth first (each answer followed by its
+            own answers); with breadth_first=True the direct answers come
+            first, then their answers, and so on. An explicit stack (or
+            queue) is used, so very long conversations are not a problem.
+            """
+            root = self.tweets.get(tweet_id)
+            if root is None:
+                return
+            if breadth_first:
+                queue = deque([root])
+                while queue:
+                    current = queue.popleft()
+                    yield current
+                    if current.children:
+                        queue.extend(current.children)
+            else:
+                stack = [root]
+                while stack:
+                    current = stack.pop()
+                    yield current
+                    if current.children:
+                        # Reversed, so the first answer is visited first
+                        stack.extend(reversed(current.children))
 
         def __iter__(self):
             """
@@ -85,21 +356,84 @@ class Twitter():
                 yield curr.tweet
                 # Go to the next tweet
                 curr = curr.next
+
+        def __reversed__(self):
+            """
+            Iterate backward through the twitter thread
+            """
+            curr = self.tail
+            while curr is not None:
+                yield curr.tweet
+                curr = curr.prev
+
+        def __len__(self):
+            """
+            Support the len() function
+            """
+            return self.size
     
     def __init__(self):
         """
-        Create a list holding all the TwitterThread objects
+        Create a list holding all the TwitterThread objects, and a
+        dictionary mapping the id of every tweet to its thread
         """
         self.twitter = []
+        self.threads = {}
       
     def add_new_thread(self, twitter_thread):
         """
         Add a TwitterThread object to the list
         """
         self.twitter.append(twitter_thread)
+        twitter_thread.twitter = self
+        for tweet_id in twitter_thread.tweets:
+            self.threads[tweet_id] = twitter_thread
         print("Thread added successfuly")
         return 0
 
+    def get_thread(self, tweet_id):
+        """
+        Return the TwitterThread containing the tweet with the given id, or None
+        """
+        return self.threads.get(tweet_id)
+
+    def get_tweet(self, tweet_id):
+        """
+        Return the Tweet with the given id, or None
+        """
+        thread = self.threads.get(tweet_id)
+        if thread is None:
+            return None
+        return thread.tweets[tweet_id]
+
+    def feed(self, after=None):
+        """
+        Give the tweets of all the threads in the order they were written,
+        starting after the tweet id 'after'. Every thread is made of lists
+        already sorted by id, so they are merged with a heap (k-way merge)
+        instead of being sorted again. Each list is entered with a binary
+        search, so starting in the middle of the feed costs O(k log n).
+        """
+        runs = []
+        for thread in self.twitter:
+            for run, start, end in thread._runs():
+                if after is not None:
+                    start = bisect.bisect_right(run, after, start, end, key=lambda tweet: tweet.id)
+                if start < end:
+                    runs.append(itertools.islice(run, start, end))
+        return heapq.merge(*runs, key=lambda tweet: tweet.id)
+
+    def feed_page(self, cursor=None, n=20):
+        """
+        Return a page of at most n tweets of the feed and the cursor of the
+        next page (None after the last page). 'cursor' is the value returned
+        with the previous page.
+        """
+        tweets = list(itertools.islice(self.feed(cursor), n))
+        if len(tweets) < n:
+            return tweets, None
+        return tweets, tweets[-1].id
+
     def print_thread(self):
         """
         Print each TwitterThread object
@@ -109,14 +443,15 @@ class Twitter():
             print()
 
 # Test Cases
-twitter = Twitter()
-new_thread = twitter.TwitterThread()
-tweet_1 = new_thread.Tweet("Hello World", "federico")
-print(tweet_1) # 'Hello World' created by federico
-new_thread.new_thread(tweet_1, "federico")
-print(new_thread) # twitter-thread['Hello World' created by federico]
-twitter.add_new_thread(new_thread) # Thread added successfuly
-twitter.print_thread() # twitter-thread['Hello World' created by federico]
-tweet_2 = new_thread.Tweet("Hello to you", "luca")
-new_thread.answer_tweet(tweet_2, "luca")
-print(new_thread) # twitter-thread['Hello World' created by federico, 'Hello to you' created by luca]
\ No newline at end of file
+if __name__ == "__main__":
+    twitter = Twitter()
+    new_thread = twitter.TwitterThread()
+    tweet_1 = new_thread.Tweet("Hello World", "federico")
+    print(tweet_1) # 'Hello World' created by federico
+    new_thread.new_thread(tweet_1, "federico")
+    print(new_thread) # twitter-thread['Hello World' created by federico]
+    twitter.add_new_thread(new_thread) # Thread added successfuly
+    twitter.print_thread() # twitter-thread['Hello World' created by federico]
+    tweet_2 = new_thread.Tweet("Hello to you", "luca")
+    new_thread.answer_tweet(tweet_2, "luca")
+    print(new_thread) # twitter-thread['Hello World' created by federico, 'Hello to you' created by luca]
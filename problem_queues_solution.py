@@ -1,112 +1,509 @@
+import heapq
+import itertools
 from datetime import datetime, timedelta
+from functools import lru_cache
+
+from rendering import Renderable
+
+DATE_FORMAT = '%m/%d/%y %H:%M'  # '09/18/19 01:55'
+EPOCH = datetime(1970, 1, 1)
+
+
+@lru_cache(maxsize=65536)
+def parse_departure(date_string):
+    """
+    Convert a departure string in DATE_FORMAT into the number of minutes
+    since EPOCH. Comparing two integers is much faster than comparing two
+    datetime objects, and datetime.strptime is slow, so the common case of
+    a zero padded string ('09/18/19 01:55') is read by slicing it. Other
+    strings are still accepted through strptime. Flight schedules repeat
+    the same times a lot, so the results are cached.
+    """
+    if (len(date_string) == 14 and date_string[2] == '/' and date_string[5] == '/'
+            and date_string[8] == ' ' and date_string[11] == ':' and date_string.isascii()
+            and (date_string[0:2] + date_string[3:5] + date_string[6:8]
+                 + date_string[9:11] + date_string[12:14]).isdigit()):
+        # Only digits: int() would also accept ' 9' or '+9', which strptime refuses
+        try:
+            year = int(date_string[6:8])
+            # Same rule as %y: 69-99 are in the 1900s, 00-68 in the 2000s
+            year += 1900 if year >= 69 else 2000
+            # datetime() checks that the month, day, hour and minute are valid
+            date_time = datetime(year, int(date_string[0:2]), int(date_string[3:5]),
+                                 int(date_string[9:11]), int(date_string[12:14]))
+        except ValueError:
+            date_time = datetime.strptime(date_string, DATE_FORMAT)
+    else:
+        date_time = datetime.strptime(date_string, DATE_FORMAT)
+    return (date_time - EPOCH) // timedelta(minutes=1)
+
+
+def format_departure(departure):
+    """
+    Convert minutes since EPOCH back into a string in DATE_FORMAT
+    """
+    return (EPOCH + timedelta(minutes=departure)).strftime(DATE_FORMAT)
+
+
+def now_minutes():
+    """
+    Return the current time as (fractional) minutes since EPOCH so it can
+    be compared with the departure of a flight
+    """
+    return (datetime.now() - EPOCH) / timedelta(minutes=1)
 
 # Airport departure queue
-class Airport_Departures():
+class Airport_Departures(Renderable):
     """
     The Airport_Departures class allow users to enter a flight to the flights queue. Flights will be dequeued according to flight departure time compared to the current time. If a flight is a delayed, it will move back in the queue before the closest flight.
     """
+    render_trailing = True  # str() gives "[flight1, flight2, ]"
+    instrumented_operations = ('enqueue_flight', 'enqueue_flights', 'dequeue_flight', 'reschedule')
+
     class Flight():
         """
         Each Flight in the queue will have a code assigned to it and the departure time.
+        The departure is stored as minutes since EPOCH. It can be given
+        either as a string in DATE_FORMAT or directly as minutes.
         """
+        __slots__ = ('code', 'departure')
+
         def __init__(self, code, date_string):
             self.code = code
-            self.date_time = datetime.strptime(date_string, '%m/%d/%y %H:%M') # '09/18/19 01:55'
+            if isinstance(date_string, str):
+                date_string = parse_departure(date_string)
+            self.departure = date_string
+
+        @property
+        def date_time(self):
+            """
+            Departure time as a datetime object
+            """
+            return EPOCH + timedelta(minutes=self.departure)
         
         def __str__(self):
             """
             Graphical representation of the flight
             """
-            return "Flight code {}. Departure time: {}".format(self.code, self.date_time.strftime('%m/%d/%y %H:%M'))
+            return "Flight code {}. Departure time: {}".format(self.code, format_departure(self.departure))
 
     def __init__(self):
         """
-        Initialize an empty queue
+        Initialize an empty queue. The flights are kept in a binary heap
+        ordered by departure time, so the earliest flight is always at
+        index 0. The 'flights' dictionary maps each code to its heap entry.
         """
         self.queue = []
+        self.flights = {}
+        self.counter = itertools.count()  # Tie breaker for equal departure times
+
+    def _push(self, flight):
+        """
+        Add a heap entry for the flight and register it in the code index.
+        Each entry is a list [departure minutes, order, flight].
+        """
+        entry = [flight.departure, next(self.counter), flight]
+        self.flights[flight.code] = entry
+        heapq.heappush(self.queue, entry)
 
     def enqueue_flight(self, code, date_string):
         """
         Add a new Flight at the back of the queue with a value and a user attached. The Flight will always be added at the back of the queue.
         """
         # Check if the date and time is greater than current time
-        if datetime.strptime(date_string, '%m/%d/%y %H:%M') <= datetime.now():
+        departure = parse_departure(date_string)
+        if departure <= now_minutes():
             print("Invalid flight departure time.")
             return None
 
         # Check if the flight code is already in the queue
-        for flight in self.queue:
-            if flight.code == code:
-                print("Flight already in the queue.")
-                return None
+        if code in self.flights:
+            print("Flight already in the queue.")
+            return None
         
-        new_flight = Airport_Departures.Flight(code, date_string)
-        self.queue.append(new_flight)
+        new_flight = Airport_Departures.Flight(code, departure)
+        self._push(new_flight)
+
+    def enqueue_flights(self, rows):
+        """
+        Add many flights at once. 'rows' is any iterable of (code, date_string)
+        pairs, for example csv.reader() over a schedule file. Flights in the
+        past and codes already in the queue are skipped without a message.
+        The new entries are appended and the heap is rebuilt once at the end
+        (O(n)) instead of pushing every flight (O(n log n)).
+        Return the number of flights added.
+        """
+        now = now_minutes()
+        flights = self.flights
+        queue = self.queue
+        counter = self.counter
+        Flight = Airport_Departures.Flight
+        added = 0
+        for code, date_string in rows:
+            departure = parse_departure(date_string)
+            if departure <= now or code in flights:
+                continue
+            entry = [departure, next(counter), Flight(code, departure)]
+            flights[code] = entry
+            queue.append(entry)
+            added += 1
+        heapq.heapify(queue)
+        return added
 
     def dequeue_flight(self):
         """
         Dequeue the earliest flight in the queue. 
         """
         # Check if the queue is empty
-        if len(self.queue) == 0:
+        if len(self) == 0:
             print("There are no flights in the queue")
             return None
 
-        earliest_flight = self.queue[0]
-        for flight in self.queue:
-            if flight.date_time < earliest_flight.date_time:
-                index = self.queue.index(flight)
+        # Skip the entries invalidated by reschedule()
+        while True:
+            flight = heapq.heappop(self.queue)[-1]
+            if flight is not None:
+                break
 
-        self.queue.pop(index)
-        print(f"Flight code {flight.code} has been successfuly dequeued and it is ready to depart on {flight.date_time.strftime('%m/%d/%y %H:%M')}.")
-        return None
+        del self.flights[flight.code]
+        print(f"Flight code {flight.code} has been successfuly dequeued and it is ready to depart on {format_departure(flight.departure)}.")
+        return flight
 
     def reschedule(self, code, date_string):
         """
         Allows the user to change the departure date and time of a particular flight through the unique code.
         """
-        new_date_time = datetime.strptime(date_string, '%m/%d/%y %H:%M')
-        if new_date_time <= datetime.now():
+        new_departure = parse_departure(date_string)
+        if new_departure <= now_minutes():
             print("Invalid departure date")
             return None
 
-        for flight in self.queue:
-            if flight.code == code:
-                flight.date_time = new_date_time
-                print(f"Departure time of flight code {code} has been updated")
-                return None
+        if code in self.flights:
+            # Invalidate the old entry and push the flight again with the
+            # new departure time. The old entry is discarded when popped.
+            entry = self.flights[code]
+            flight = entry[-1]
+            entry[-1] = None
+            flight.departure = new_departure
+            self._push(flight)
+            # Rebuild the heap when most of its entries are invalidated
+            if len(self.queue) > 2 * len(self.flights) + 16:
+                self.queue = [entry for entry in self.queue if entry[-1] is not None]
+                heapq.heapify(self.queue)
+            print(f"Departure time of flight code {code} has been updated")
+            return None
 
         print("Flight not found. Please input a correct code.")
 
+    def _observe(self, metrics, operation, args, result):
+        """
+        Extra metrics when the queue is instrumented: how long each flight
+        waited in the queue before being dequeued, and the gauges of
+        _gauge()
+        """
+        if operation == 'enqueue_flight':
+            code = args[0]
+            if code in self.flights and code not in metrics.marks:
+                metrics.mark(code)
+        elif operation == 'enqueue_flights':
+            for code in self.flights:
+                if code not in metrics.marks:
+                    metrics.mark(code)
+        elif operation == 'dequeue_flight' and result is not None:
+            self._observe_wait(metrics, result)
+        self._gauge(metrics)
+
+    def _observe_wait(self, metrics, flight):
+        """
+        Record how long a flight that just left waited in the queue
+        """
+        waited = metrics.elapsed(flight.code)
+        if waited is not None:
+            metrics.observe('flight_wait_seconds', waited, scale=1e3)
+
+    def _gauge(self, metrics):
+        """
+        Number of heap entries (including the ones invalidated by reschedule)
+        """
+        metrics.gauge('heap_entries', len(self.queue))
+
     def __len__(self):
         """
         Support the len() function
         """
-        return len(self.queue)
+        return len(self.flights)
+
+    def __iter__(self):
+        """
+        Iterate through the flights in the order they were added
+        """
+        for entry in self.flights.values():
+            yield entry[-1]
+
+    def __reversed__(self):
+        """
+        Iterate through the flights starting from the last one added
+        """
+        for entry in reversed(self.flights.values()):
+            yield entry[-1]
+
+
+class TimingWheelDepartures(Airport_Departures):
+    """
+    Airport_Departures that releases flights when their departure time
+    comes instead of waiting for someone to call dequeue_flight.
+
+    The flights are stored in a hierarchical timing wheel (a calendar
+    queue). Level 0 has 64 slots of one minute, level 1 has 64 slots of
+    64 minutes, level 2 has 64 slots of 4096 minutes, and so on. A flight
+    goes in the lowest level whose slots are small enough to reach its
+    departure from the current time of the wheel. When the time reaches
+    a slot of a higher level, its flights are moved down to the lower
+    levels ("cascade"). Adding or moving a flight is O(1), and each flight
+    is moved down at most once per level. Each level keeps a 64 bit mask
+    of its non-empty slots, so empty minutes are skipped without being
+    visited one by one.
+    """
+    SLOT_BITS = 6                 # 64 slots per level
+    SLOTS = 1 << SLOT_BITS
+    LEVELS = 5                    # 64^5 minutes is about 2000 years
+    instrumented_operations = Airport_Departures.instrumented_operations + ('pop_due',)
+
+    def __init__(self, now=None):
+        """
+        Initialize an empty wheel starting at 'now' (minutes since EPOCH,
+        the current time by default)
+        """
+        super().__init__()
+        self.now = int(now_minutes() if now is None else now)
+        self.slots = [[{} for _ in range(self.SLOTS)] for _ in range(self.LEVELS)]
+        self.masks = [0] * self.LEVELS  # Bit s is set when slot s is not empty
+        self.places = {}                # code -> (level, slot)
+        self.overdue = {}               # Flights already due when they were added
+        self.wakeup = None              # asyncio.Event used by run_dispatcher()
+
+    def _place(self, flight):
+        """
+        Put a flight in the wheel according to the current time
+        """
+        departure = flight.departure
+        if departure < self.now:
+            self.overdue[flight.code] = flight
+            self.places[flight.code] = None
+            return
+        for level in range(self.LEVELS):
+            # Lowest level where the departure and now only differ inside
+            # the range covered by the slots of this level
+            shift = self.SLOT_BITS * (level + 1)
+            if departure >> shift == self.now >> shift:
+                slot = (departure >> (self.SLOT_BITS * level)) & (self.SLOTS - 1)
+                self.slots[level][slot][flight.code] = flight
+                self.masks[level] |= 1 << slot
+                self.places[flight.code] = (level, slot)
+                return
+        raise ValueError("Departure too far in the future")
+
+    def _take(self, code):
+        """
+        Remove a flight from the wheel and return it
+        """
+        place = self.places.pop(code)
+        if place is None:
+            return self.overdue.pop(code)
+        level, slot = place
+        bucket = self.slots[level][slot]
+        flight = bucket.pop(code)
+        if not bucket:
+            self.masks[level] &= ~(1 << slot)
+        return flight
+
+    def _push(self, flight):
+        """
+        Register the flight and put it in the wheel
+        """
+        self.flights[flight.code] = [flight.departure, next(self.counter), flight]
+        self._place(flight)
+        if self.wakeup is not None:
+            self.wakeup.set()
+
+    def _remove(self, code):
+        """
+        Take a flight out of the queue by code
+        """
+        entry = self.flights.pop(code, None)
+        if entry is None:
+            return None
+        return self._take(code)
+
+    def _next_slot(self):
+        """
+        Return (level, slot, start time) of the first non-empty slot after
+        the current time, or None if the wheel is empty. A lower level
+        always comes before a higher one.
+        """
+        for level in range(self.LEVELS):
+            mask = self.masks[level]
+            if not mask:
+                continue
+            current = (self.now >> (self.SLOT_BITS * level)) & (self.SLOTS - 1)
+            # The current slot of a higher level was already moved down
+            first = current if level == 0 else current + 1
+            mask = mask >> first << first
+            if not mask:
+                continue
+            slot = (mask & -mask).bit_length() - 1
+            shift = self.SLOT_BITS * (level + 1)
+            start = (self.now >> shift << shift) | (slot << (self.SLOT_BITS * level))
+            return level, slot, start
+        return None
+
+    def next_departure(self):
+        """
+        Return the time (minutes since EPOCH) when pop_due() may next have
+        something to do, or None if there are no flights
+        """
+        if self.overdue:
+            return self.now
+        found = self._next_slot()
+        return None if found is None else found[2]
+
+    def pop_due(self, now=None):
+        """
+        Remove and give back every flight whose departure is at or before
+        'now' (minutes since EPOCH, the current time by default), in order
+        of departure. The wheel time moves forward to 'now'.
+
+        Each flight is taken out of the queue only when it is given back,
+        so if the caller stops early (or its code raises) the flights not
+        given back yet stay in the queue.
+        """
+        now = int(now_minutes() if now is None else now)
+        for flight in sorted(self.overdue.values(), key=lambda flight: flight.departure):
+            if self.overdue.get(flight.code) is flight:
+                yield self._release(flight.code)
+
+        while True:
+            found = self._next_slot()
+            if found is None or found[2] > now:
+                break
+            level, slot, start = found
+            self.now = start
+            bucket = self.slots[level][slot]
+            if level == 0:
+                # _take() clears the bit of the slot when it becomes empty
+                while bucket:
+                    yield self._release(next(iter(bucket)))
+            else:
+                # Cascade: the flights move to the lower levels
+                self.slots[level][slot] = {}
+                self.masks[level] &= ~(1 << slot)
+                for flight in bucket.values():
+                    self._place(flight)
+        self.now = max(self.now, now)
+
+    def _release(self, code):
+        """
+        Take a due flight out of the queue for pop_due(). When the queue is
+        instrumented, the time the flight waited is recorded here because
+        pop_due() gives many flights per call.
+        """
+        flight = self._remove(code)
+        metrics = self.__dict__.get('metrics')
+        if metrics is not None:
+            self._observe_wait(metrics, flight)
+        return flight
+
+    def dequeue_flight(self):
+        """
+        Dequeue the earliest flight in the queue, even if it is not due yet
+        """
+        if len(self) == 0:
+            print("There are no flights in the queue")
+            return None
+
+        if self.overdue:
+            flight = min(self.overdue.values(), key=lambda flight: flight.departure)
+        else:
+            level, slot, _ = self._next_slot()
+            flight = min(self.slots[level][slot].values(), key=lambda flight: flight.departure)
+        self._remove(flight.code)
+        print(f"Flight code {flight.code} has been successfuly dequeued and it is ready to depart on {format_departure(flight.departure)}.")
+        return flight
+
+    def enqueue_flights(self, rows):
+        """
+        Add many flights at once, skipping past flights and repeated codes.
+        Return the number of flights added.
+        """
+        now = now_minutes()
+        added = 0
+        for code, date_string in rows:
+            departure = parse_departure(date_string)
+            if departure <= now or code in self.flights:
+                continue
+            self._push(Airport_Departures.Flight(code, departure))
+            added += 1
+        return added
+
+    def reschedule(self, code, date_string):
+        """
+        Allows the user to change the departure date and time of a particular flight through the unique code.
+        """
+        new_departure = parse_departure(date_string)
+        if new_departure <= now_minutes():
+            print("Invalid departure date")
+            return None
+
+        flight = self._remove(code)
+        if flight is None:
+            print("Flight not found. Please input a correct code.")
+            return None
+
+        flight.departure = new_departure
+        self._push(flight)
+        print(f"Departure time of flight code {code} has been updated")
+
+    async def run_dispatcher(self, callback, clock=now_minutes):
+        """
+        Call callback(flight) for every flight when its departure comes,
+        until the task is cancelled. Between departures the task sleeps
+        until the next non-empty slot; adding a flight wakes it up in case
+        the new flight leaves earlier.
+        """
+        import asyncio
+        self.wakeup = asyncio.Event()
+        try:
+            while True:
+                for flight in self.pop_due(clock()):
+                    callback(flight)
+                self.wakeup.clear()
+                following = self.next_departure()
+                timeout = None if following is None else max(0, (following - clock()) * 60)
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.wakeup = None
 
-    def __str__(self):
+    def _gauge(self, metrics):
         """
-        Suppport the str() function to provide a string representation of the queue.
+        Current time of the wheel (the heap of Airport_Departures is not used)
         """
-        string = "["
-        for flight in self.queue:
-            string += str(flight)  # This uses the __str__ from the Flight class
-            string += ", "
-        string += "]"
-        return string
+        metrics.gauge('wheel_time', self.now)
 
 # Test cases
-airport = Airport_Departures()
-airport.enqueue_flight('GTJH', '09/18/22 11:55')
-airport.enqueue_flight('RTKJ', '07/09/22 22:55')
-airport.enqueue_flight('ER34', '05/12/22 09:55')
-airport.enqueue_flight('VFT9', '04/29/22 05:55')
-airport.enqueue_flight('VFT9', '04/29/22 05:55') # Flight already in the queue
-airport.enqueue_flight('V56Y', '02/20/19 01:55') # Invalid flight departure time
-print(airport) # [Flight code GTJH. Departure time: 09/18/22 11:55, Flight code RTKJ. Departure time: 07/09/22 22:55, Flight code ER34. Departure time: 05/12/22 09:55, Flight code VFT9. Departure time: 04/29/22 05:55, ]
-airport.dequeue_flight() # Flight code VFT9 has been successfuly dequeued and it is ready to depart on 04/29/22 05:55.
-airport.dequeue_flight() # Flight code ER34 has been successfuly dequeued and it is ready to depart on 05/12/22 09:55.
-print(airport) #[Flight code GTJH. Departure time: 09/18/22 11:55, Flight code RTKJ. Departure time: 07/09/22 22:55, ]
-airport.reschedule('GTJH', '11/02/22 13:55') # Departure time of flight code GTJH has been updated
-print(airport) # [Flight code GTJH. Departure time: 11/02/22 13:55, Flight code RTKJ. Departure time: 07/09/22 22:55, ]
-               
\ No newline at end of file
+if __name__ == "__main__":
+    airport = Airport_Departures()
+    airport.enqueue_flight('GTJH', '09/18/22 11:55')
+    airport.enqueue_flight('RTKJ', '07/09/22 22:55')
+    airport.enqueue_flight('ER34', '05/12/22 09:55')
+    airport.enqueue_flight('VFT9', '04/29/22 05:55')
+    airport.enqueue_flight('VFT9', '04/29/22 05:55') # Flight already in the queue
+    airport.enqueue_flight('V56Y', '02/20/19 01:55') # Invalid flight departure time
+    print(airport) # [Flight code GTJH. Departure time: 09/18/22 11:55, Flight code RTKJ. Departure time: 07/09/22 22:55, Flight code ER34. Departure time: 05/12/22 09:55, Flight code VFT9. Departure time: 04/29/22 05:55, ]
+    airport.dequeue_flight() # Flight code VFT9 has been successfuly dequeued and it is ready to depart on 04/29/22 05:55.
+    airport.dequeue_flight() # Flight code ER34 has been successfuly dequeued and it is ready to depart on 05/12/22 09:55.
+    print(airport) #[Flight code GTJH. Departure time: 09/18/22 11:55, Flight code RTKJ. Departure time: 07/09/22 22:55, ]
+    airport.reschedule('GTJH', '11/02/22 13:55') # Departure time of flight code GTJH has been updated
+    print(airport) # [Flight code GTJH. Departure time: 11/02/22 13:55, Flight code RTKJ. Departure time: 07/09/22 22:55, ]
@@ -1,43 +1,263 @@
+import heapq
+from collections import deque
+from datetime import datetime
+from functools import lru_cache
+
+
 class FamilyTree():
     """
     Initialize a new Family Tree. When created, a new family tree gets the name of the first person on the tree.
     """
+    instrumented_operations = ('insert', 'merge', 'delete', 'rename', 'change_birthday', 'find', 'rank',
+                               'select', 'count_between', 'get_generations')
+
     class Person():
         """
         Create a new person object. The new person object accepts as parameters a name and a birthday
         """
+        __slots__ = ('name', 'birthday', 'born', 'right', 'left', 'height', 'size',
+                     'oldest', 'youngest')
+
         def __init__(self, name, birthday):
             """
             Create the person object providing name and birthday
             """
             self.name = name
             self.birthday = birthday
+            self.born = None   # (birthday date, name), None if the birthday is not a valid date
             self.right = None
             self.left = None
+            self.height = 1    # Height of the sub-tree rooted at this person
+            self.size = 1      # Number of people in the sub-tree rooted at this person
+            self.oldest = None    # Smallest 'born' of the sub-tree rooted at this person
+            self.youngest = None  # Largest 'born' of the sub-tree rooted at this person
+            self._set_born()
+
+        def _set_born(self):
+            """
+            Compute 'born' from the name and the birthday. Alone in its
+            sub-tree, the person is both the oldest and the youngest.
+            """
+            date = FamilyTree._parse_birthday(self.birthday)
+            self.born = None if date is None else (date, self.name)
+            self.oldest = self.youngest = self.born
 
         def change_name(self, name:str):
             """
-            Set a new name for a person
+            The name is the key of the person in the tree: changing it here
+            would leave the person in the wrong place. Use FamilyTree.rename().
             """
-            self.name = name
-            return self.name
+            raise RuntimeError("Use FamilyTree.rename() to change the name of a person")
 
         def change_birthday(self, birthday:str):
             """
-            Set a new birthday for a person
+            The birthday is indexed by the tree. Use FamilyTree.change_birthday().
             """
-            self.birthday = birthday
-            return self.birthday
+            raise RuntimeError("Use FamilyTree.change_birthday() to change the birthday of a person")
 
         def __str__(self):
             return "[name: {}, birthday: {}], ".format(self.name, self.birthday)
 
+    class BirthdayIndex():
+        """
+        Sorted set of (birthday date, name) pairs, used to find the people
+        born between two dates. The pairs are kept in their own AVL tree,
+        so adding or removing one is O(log n), like a change of the family
+        tree itself (a sorted list would have to shift its items, O(n)).
+        """
+        class Entry():
+            __slots__ = ('key', 'left', 'right', 'height')
+
+            def __init__(self, key):
+                self.key = key
+                self.left = None
+                self.right = None
+                self.height = 1
+
+        def __init__(self, keys=()):
+            """
+            Build the index from pairs already sorted, in O(n)
+            """
+            keys = list(keys)
+            self.size = len(keys)
+            self.root = self._build(keys, 0, len(keys) - 1)
+
+        def _build(self, keys, first, last):
+            if first > last:
+                return None
+            middle = (first + last) // 2
+            entry = FamilyTree.BirthdayIndex.Entry(keys[middle])
+            entry.left = self._build(keys, first, middle - 1)
+            entry.right = self._build(keys, middle + 1, last)
+            self._update(entry)
+            return entry
+
+        def _height(self, entry):
+            return 0 if entry is None else entry.height
+
+        def _update(self, entry):
+            entry.height = max(self._height(entry.left), self._height(entry.right)) + 1
+
+        def _rotate_left(self, entry):
+            right = entry.right
+            entry.right = right.left
+            right.left = entry
+            self._update(entry)
+            self._update(right)
+            return right
+
+        def _rotate_right(self, entry):
+            left = entry.left
+            entry.left = left.right
+            left.right = entry
+            self._update(entry)
+            self._update(left)
+            return left
+
+        def _rebalance(self, entry):
+            """
+            Same rotations as FamilyTree._rebalance
+            """
+            self._update(entry)
+            balance = self._height(entry.left) - self._height(entry.right)
+            if balance > 1:
+                if self._height(entry.left.left) < self._height(entry.left.right):
+                    entry.left = self._rotate_left(entry.left)
+                return self._rotate_right(entry)
+            if balance < -1:
+                if self._height(entry.right.right) < self._height(entry.right.left):
+                    entry.right = self._rotate_right(entry.right)
+                return self._rotate_left(entry)
+            return entry
+
+        def add(self, key):
+            """
+            Add a (date, name) pair
+            """
+            self.root = self._add(key, self.root)
+
+        def _add(self, key, entry):
+            if entry is None:
+                self.size += 1
+                return FamilyTree.BirthdayIndex.Entry(key)
+            if key < entry.key:
+                entry.left = self._add(key, entry.left)
+            elif key > entry.key:
+                entry.right = self._add(key, entry.right)
+            else:
+                return entry
+            return self._rebalance(entry)
+
+        def remove(self, key):
+            """
+            Remove a (date, name) pair (nothing happens if it is missing)
+            """
+            self.root = self._remove(key, self.root)
+
+        def _remove(self, key, entry):
+            if entry is None:
+                return None
+            if key < entry.key:
+                entry.left = self._remove(key, entry.left)
+            elif key > entry.key:
+                entry.right = self._remove(key, entry.right)
+            elif entry.left is None or entry.right is None:
+                self.size -= 1
+                return entry.left if entry.left is not None else entry.right
+            else:
+                # Take the place of the smallest pair on the right
+                successor = entry.right
+                while successor.left is not None:
+                    successor = successor.left
+                entry.key = successor.key
+                entry.right = self._remove(successor.key, entry.right)
+            return self._rebalance(entry)
+
+        def from_key(self, start):
+            """
+            Give the pairs greater than or equal to 'start' in sorted order.
+            Only the path to 'start' is walked before the first pair, so
+            reading k pairs is O(log n + k).
+            """
+            stack = []
+            entry = self.root
+            while stack or entry is not None:
+                if entry is not None:
+                    if entry.key < start:
+                        entry = entry.right  # The entry and its left side are too small
+                    else:
+                        stack.append(entry)
+                        entry = entry.left
+                else:
+                    entry = stack.pop()
+                    yield entry.key
+                    entry = entry.right
+
+        def __iter__(self):
+            return self.from_key(())
+
+        def __len__(self):
+            return self.size
+
+
+    def __init__(self, name:str=None, birthday:str=None):
+        """
+        Initialize a new Family Tree with the first person of the tree.
+        If no name is provided the tree starts empty.
+        """
+        self.root = None
+        self.birthdays = FamilyTree.BirthdayIndex()  # (birthday date, name) pairs
+        self.last_visited = 0  # People visited by the last find()
+        if name is not None:
+            self.insert(name, birthday)
+
+    @classmethod
+    def from_sorted(cls, records):
+        """
+        Build a perfectly balanced tree from an iterable of (name, birthday)
+        pairs already sorted by name. The middle person of each range
+        becomes the root of the sub-tree, so the whole tree is built in
+        O(n) without any rotation. Repeated names are ignored like insert().
+        """
+        people = []
+        for name, birthday in records:
+            if people and people[-1].name == name:
+                continue
+            people.append(FamilyTree.Person(name, birthday))
+
+        tree = cls()
+        tree.root = tree._build_balanced(people, 0, len(people) - 1)
+        tree.birthdays = cls.BirthdayIndex(sorted(person.born for person in people if person.born is not None))
+        return tree
+
+    @staticmethod
+    @lru_cache(maxsize=65536)
+    def _parse_birthday(birthday):
+        """
+        Convert a birthday string like '07/10/1992' (month/day/year) into a
+        date that can be compared. Return None if the birthday is missing
+        or not in that format, in which case the person is not indexed.
+        strptime is slow and a large family shares few different
+        birthdays, so the results are cached.
+        """
+        try:
+            return datetime.strptime(birthday, '%m/%d/%Y').date()
+        except (TypeError, ValueError):
+            return None
 
-    def __init__(self, name:str, birthday:str):
+    def _build_balanced(self, people, first, last):
         """
-        Initialize a new Family Tree with the first person of the tree
+        Recursively link the Person objects people[first..last] (sorted by
+        name) into a balanced sub-tree and return its root.
         """
-        self.root = FamilyTree.Person(name, birthday)
+        if first > last:
+            return None
+        middle = (first + last) // 2
+        node = people[middle]
+        node.left = self._build_balanced(people, first, middle - 1)
+        node.right = self._build_balanced(people, middle + 1, last)
+        self._update(node)
+        return node
 
     
     def insert(self, name:str, birthday:str):
@@ -47,70 +267,401 @@ class FamilyTree():
         node.  Otherwise, use _insert to recursively
         find the location to insert.
         """
-        if self.root is None:
-            self.root = FamilyTree.Person(name, birthday)
+        # Names are unique in the tree
+        if self.find(name) is not None:
+            return
+
+        person = FamilyTree.Person(name, birthday)
+        self.root = self._insert(person, self.root)  # Start at the root
+
+        # Keep the birthday index sorted
+        if person.born is not None:
+            self.birthdays.add(person.born)
+
+
+    def _insert(self, person, node):
+        """
+        This function will look for a place to insert the person
+        inside of the sub-tree. It returns the new root of the sub-tree,
+        which changes when the sub-tree had to be rotated to stay
+        balanced (AVL tree).
+        """
+        if node is None:
+            # We found an empty spot
+            return person
+
+        if person.name < node.name:
+            node.left = self._insert(person, node.left)
+        elif person.name > node.name:
+            node.right = self._insert(person, node.right)
         else:
-            self._insert(name, birthday, self.root)  # Start at the root
+            # The person is already in the tree
+            return node
 
+        return self._rebalance(node)
 
-    def _insert(self, name:str, birthday:str, node):
+    def delete(self, name:str):
         """
-        This function will look for a place to insert a node
-        with the name and birthday inside of it.
+        Remove the person with the given name from the tree and return
+        it, or return None if the name is not in the tree.
+        """
+        person = self.find(name)
+        if person is None:
+            return None
+
+        self.root = self._delete(name, self.root)
+        if person.born is not None:
+            self.birthdays.remove(person.born)
+
+        # The person is alone again
+        person.left = person.right = None
+        self._update(person)
+        return person
+
+    def _delete(self, name:str, node):
+        """
+        Remove the person called 'name' from the sub-tree and return the
+        new root of the sub-tree. A person with two children is replaced
+        by the smallest person of its right side.
         """
-        if node == None:
-            return
-        
         if name < node.name:
-            if node.left is None:
-                # We found an empty spot
-                node.left = FamilyTree.Person(name, birthday)
+            node.left = self._delete(name, node.left)
+        elif name > node.name:
+            node.right = self._delete(name, node.right)
+        elif node.left is None or node.right is None:
+            return node.left if node.left is not None else node.right
+        else:
+            successor = node.right
+            while successor.left is not None:
+                successor = successor.left
+            successor.right = self._delete(successor.name, node.right)
+            successor.left = node.left
+            node = successor
+
+        return self._rebalance(node)
+
+    def merge(self, other):
+        """
+        Add every person of 'other' to this tree ('other' is not changed).
+        Both trees give their people in sorted order, so the two streams
+        are merged like in merge sort and the tree is rebuilt balanced in
+        O(n + m), instead of O(m log(n + m)) for m inserts. When a name is
+        in both trees the person of this tree is kept, like insert(). The
+        people of this tree stay the same Person objects.
+        """
+        mine = ((person.name, 0, person) for person in self._traverse_forward(self.root))
+        theirs = ((person.name, 1, person) for person in other._traverse_forward(other.root))
+        people = []
+        added = []  # Birthdays of the people coming from 'other'
+        for name, source, person in heapq.merge(mine, theirs):
+            if people and people[-1].name == name:
+                continue  # The person of this tree comes first
+            if source == 1:
+                person = FamilyTree.Person(name, person.birthday)
+                if person.born is not None:
+                    added.append(person.born)
+            people.append(person)
+
+        self.root = self._build_balanced(people, 0, len(people) - 1)
+        self.birthdays = FamilyTree.BirthdayIndex(heapq.merge(self.birthdays, sorted(added)))
+        return self
+
+    def rename(self, old:str, new:str):
+        """
+        Change the name of a person. The name is the key of the tree, so
+        the person is taken out and inserted again at the place of its new
+        name (the same Person object is kept). Return the person, or None
+        if 'old' is not in the tree or 'new' is already used.
+        """
+        if old == new:
+            return self.find(old)
+        if self.find(new) is not None:
+            return None
+        person = self.delete(old)
+        if person is None:
+            return None
+
+        person.name = new
+        person._set_born()
+        self.root = self._insert(person, self.root)
+        if person.born is not None:
+            self.birthdays.add(person.born)
+        return person
+
+    def change_birthday(self, name:str, birthday:str):
+        """
+        Change the birthday of a person and update the birthday index and
+        the oldest/youngest of every sub-tree above it. Return the person,
+        or None if the name is not in the tree.
+        """
+        path = []
+        node = self.root
+        while node is not None and node.name != name:
+            path.append(node)
+            node = node.left if name < node.name else node.right
+        if node is None:
+            return None
+
+        if node.born is not None:
+            self.birthdays.remove(node.born)
+        node.birthday = birthday
+        node._set_born()
+        if node.born is not None:
+            self.birthdays.add(node.born)
+
+        # Only the sub-trees on the path contain the person
+        self._update(node)
+        for parent in reversed(path):
+            self._update(parent)
+        return node
+
+
+    def _height(self, node):
+        """
+        Return the height of a sub-tree. An empty sub-tree has a height of 0.
+        """
+        if node is None:
+            return 0
+        return node.height
+
+    def _size(self, node):
+        """
+        Return the number of people in a sub-tree. An empty sub-tree has a size of 0.
+        """
+        if node is None:
+            return 0
+        return node.size
+
+    def _update(self, node):
+        """
+        Recompute the height, the size and the oldest/youngest person of
+        the node from its children. Every modification calls it on the
+        nodes of the path it changed, from the bottom up, so the values
+        stay correct in O(log n) per modification.
+        """
+        left, right = node.left, node.right
+        node.height = max(self._height(left), self._height(right)) + 1
+        node.size = self._size(left) + self._size(right) + 1
+
+        oldest = youngest = node.born
+        for child in (left, right):
+            if child is not None and child.oldest is not None:
+                if oldest is None or child.oldest < oldest:
+                    oldest = child.oldest
+                if youngest is None or child.youngest > youngest:
+                    youngest = child.youngest
+        node.oldest = oldest
+        node.youngest = youngest
+
+    def _rotate_left(self, node):
+        """
+        Rotate the sub-tree to the left and return the new root:
+
+            node                 right
+               \               /
+               right   ->   node
+               /               \
+           middle             middle
+        """
+        right = node.right
+        node.right = right.left
+        right.left = node
+        self._update(node)
+        self._update(right)
+        return right
+
+    def _rotate_right(self, node):
+        """
+        Rotate the sub-tree to the right and return the new root (mirror
+        image of _rotate_left).
+        """
+        left = node.left
+        node.left = left.right
+        left.right = node
+        self._update(node)
+        self._update(left)
+        return left
+
+    def _rebalance(self, node):
+        """
+        Update the height of the node and rotate the sub-tree if the
+        heights of the left and right sides differ by more than one.
+        Return the root of the balanced sub-tree.
+        """
+        self._update(node)
+        balance = self._height(node.left) - self._height(node.right)
+
+        # Left side is too tall
+        if balance > 1:
+            if self._height(node.left.left) < self._height(node.left.right):
+                node.left = self._rotate_left(node.left)
+            return self._rotate_right(node)
+
+        # Right side is too tall
+        if balance < -1:
+            if self._height(node.right.right) < self._height(node.right.left):
+                node.right = self._rotate_right(node.right)
+            return self._rotate_left(node)
+
+        return node
+
+
+    def find(self, name:str):
+        """
+        Return the Person with the given name, or None if the name is not
+        in the tree. The number of people visited is kept in
+        'last_visited' for the metrics (see _observe).
+        """
+        visited = 0
+        node = self.root
+        while node is not None:
+            visited += 1
+            if name < node.name:
+                node = node.left
+            elif name > node.name:
+                node = node.right
             else:
-                self._insert(name, birthday, node.left)
+                break
+        self.last_visited = visited
+        return node
 
-        elif name > node.name:
-            if node.right is None:
-                # We found an empty spot
-                node.right = FamilyTree.Person(name, birthday)
+    def _observe(self, metrics, operation, args, result):
+        """
+        Extra metrics when the tree is instrumented: the height of the tree
+        (stored in the root, so it is free to read) and the number of
+        people visited by each find()
+        """
+        if operation == 'find':
+            metrics.observe('nodes_visited', self.last_visited)
+        metrics.gauge('height', self._height(self.root))
+
+    def __contains__(self, name):
+        """
+        Support the 'in' operator
+        """
+        return self.find(name) is not None
+
+    def __len__(self):
+        """
+        Support the len() function
+        """
+        return self._size(self.root)
+
+    def rank(self, name:str):
+        """
+        Return the number of people whose name is smaller than 'name'.
+        Each time we go right, the whole left sub-tree and the node itself
+        are smaller, so we add their size instead of visiting them.
+        """
+        count = 0
+        node = self.root
+        while node is not None:
+            if name <= node.name:
+                node = node.left
             else:
-                self._insert(name, birthday, node.right)
+                count += self._size(node.left) + 1
+                node = node.right
+        return count
 
+    def select(self, k:int):
+        """
+        Return the name at position k (starting from 0) in sorted order.
+        """
+        if k < 0 or k >= len(self):
+            raise IndexError("FamilyTree index out of range")
 
-    def get_generations(self):
+        node = self.root
+        while True:
+            left_size = self._size(node.left)
+            if k < left_size:
+                node = node.left
+            elif k > left_size:
+                k -= left_size + 1
+                node = node.right
+            else:
+                return node.name
+
+    def count_between(self, lo:str, hi:str):
         """
-        Determine the height of the BST.  Note that an empty tree
-        will have a height of 0 and a tree with one item (root) will
-        have a height of 1.
-        
-        If the tree is empty, then return 0.  Otherwise, call 
-        _get_generations on the root which will recursively determine the 
-        height of the tree.
+        Return the number of people whose name is between lo and hi
+        (both included).
         """
-        if self.root is None:
+        if lo > hi:
             return 0
-        else:
-            return self._get_generations(self.root)  # Start at the root
+        count = self.rank(hi) - self.rank(lo)
+        if hi in self:
+            count += 1
+        return count
 
+    def range(self, lo:str, hi:str):
+        """
+        Give the names between lo and hi (both included) in sorted order.
+        This is an in-order traversal that does not go left when every
+        name on the left is smaller than lo, and does not go right when
+        every name on the right is larger than hi.
+        """
+        stack = []
+        node = self.root
+        while stack or node is not None:
+            if node is not None:
+                if node.name < lo:
+                    # The node and its left side are too small
+                    node = node.right
+                else:
+                    stack.append(node)
+                    node = node.left
+            else:
+                node = stack.pop()
+                if node.name > hi:
+                    return
+                yield node.name
+                node = node.right
 
-    def _get_generations(self, node):
+    def born_between(self, start:str, end:str):
         """
-        Determine the height of the BST.  The height of a sub-tree 
-        (represented by 'node') is 1 plus the height of either the 
-        left sub-tree or the right sub-tree (whichever one is bigger).
+        Give the names of the people born between start and end (both
+        included, same format as the birthdays) ordered by birthday.
+        The birthday index is sorted, so we only look at the matches.
+        """
+        start = self._parse_birthday(start)
+        end = self._parse_birthday(end)
+        if start is None or end is None:
+            raise ValueError("Dates must be in the format mm/dd/yyyy")
+
+        for date, name in self.birthdays.from_key((start,)):
+            if date > end:
+                return
+            yield name
 
-        This function intended to be called the first time by 
-        get_generations.
+
+    def oldest(self):
         """
-        # Base case
-        if node is None:
-            return 0
-        # Search the left side of the tree 
-        left_sub = self._get_generations(node.left)
-        # Search the right side of the tree 
-        right_sub = self._get_generations(node.right)
+        Name of the person with the earliest birthday, or None. The answer
+        is kept in the root, so this is O(1).
+        """
+        if self.root is None or self.root.oldest is None:
+            return None
+        return self.root.oldest[1]
+
+    def youngest(self):
+        """
+        Name of the person with the latest birthday, or None (O(1))
+        """
+        if self.root is None or self.root.youngest is None:
+            return None
+        return self.root.youngest[1]
+
+
+    def get_generations(self):
+        """
+        Determine the height of the BST.  Note that an empty tree
+        will have a height of 0 and a tree with one item (root) will
+        have a height of 1.
 
-        # return the max between the two adding the root node
-        return max(left_sub, right_sub) + 1
+        Every person keeps the height of its own sub-tree up to date
+        when the tree is modified, so the answer is stored in the root.
+        """
+        return self._height(self.root)
 
   
     def __iter__(self):
@@ -123,49 +674,451 @@ class FamilyTree():
             print(value)
 
         """
-        yield from self._traverse_forward(self.root)  # Start at the root
+        for node in self._traverse_forward(self.root):  # Start at the root
+            yield node.name
+
+    def __reversed__(self):
+        """
+        Perform a backward traversal (reverse in order traversal) so that
+        the names are given from the largest to the smallest:
+
+        for value in reversed(my_bst):
+            print(value)
+
+        """
+        for node in self._traverse_backward(self.root):  # Start at the root
+            yield node.name
     
     def _traverse_forward(self, node):
         """
         Does a forward traversal (in-order traversal) through the 
-        BST.  If the node that we are given (which is the current
-        sub-tree) exists, then we will keep traversing on the left
-        side (thus getting the smaller numbers first), then we will 
-        provide the data in the current node, and finally we will 
-        traverse on the right side (thus getting the larger numbers last).
+        BST and gives back each Person node.
 
-        The use of the 'yield' will allow this function to support loops
-        like:
-
-        for value in my_bst:
-            print(value)
+        Instead of calling itself recursively, the function keeps its
+        own stack with the nodes that still need to be visited. We first
+        walk down the left side of the sub-tree pushing every node on
+        the stack (thus getting the smaller names first). Then we pop a
+        node, provide it, and repeat the same walk on its right side.
+        Every node is pushed and popped exactly once, so a full traversal
+        is O(n) and does not depend on the depth of the tree.
 
         The keyword 'yield' will return the value for the 'for' loop to
 	    use.  When the 'for' loop wants to get the next value, the code in
 	    this function will start back up where the last 'yield' returned a 
-	    value.  The keyword 'yield from' is used when our generator function
-        needs to call another function for which a `yield` will be called.  
-        In other words, the `yield` is delegated by the generator function
-        to another function.
+	    value.
 
         This function is intended to be called the first time by 
         the __iter__ function.
         """
-        if node is not None:
-            yield from self._traverse_forward(node.left)
+        stack = []
+        while stack or node is not None:
+            if node is not None:
+                stack.append(node)
+                node = node.left
+            else:
+                node = stack.pop()
+                yield node
+                node = node.right
+
+    def _traverse_backward(self, node):
+        """
+        Does a backward traversal (reverse in-order traversal). It is the
+        mirror image of _traverse_forward: the right side is visited first.
+        """
+        stack = []
+        while stack or node is not None:
+            if node is not None:
+                stack.append(node)
+                node = node.right
+            else:
+                node = stack.pop()
+                yield node
+                node = node.left
+
+    def _traverse_pre_order(self, node):
+        """
+        Does a pre-order traversal: the node is provided before its left
+        and right sub-trees. The right child is pushed first so that the
+        left child is popped (and visited) first.
+        """
+        stack = [node] if node is not None else []
+        while stack:
+            node = stack.pop()
+            yield node
+            if node.right is not None:
+                stack.append(node.right)
+            if node.left is not None:
+                stack.append(node.left)
+
+    def _traverse_post_order(self, node):
+        """
+        Does a post-order traversal: the node is provided after both its
+        sub-trees. 'last' remembers the node provided last so we can tell
+        if we are coming back up from the right side.
+        """
+        stack = []
+        last = None
+        while stack or node is not None:
+            if node is not None:
+                stack.append(node)
+                node = node.left
+            else:
+                top = stack[-1]
+                if top.right is not None and top.right is not last:
+                    # Visit the right side before the node itself
+                    node = top.right
+                else:
+                    last = stack.pop()
+                    yield last
+
+    def _traverse_level_order(self, node):
+        """
+        Does a level-order (breadth first) traversal: all the people of a
+        generation are provided before the people of the next one.
+        """
+        queue = deque([node] if node is not None else [])
+        while queue:
+            node = queue.popleft()
+            yield node
+            if node.left is not None:
+                queue.append(node.left)
+            if node.right is not None:
+                queue.append(node.right)
+
+    def in_order(self):
+        """
+        Names from the smallest to the largest (same as iterating the tree)
+        """
+        return iter(self)
+
+    def reverse_order(self):
+        """
+        Names from the largest to the smallest (same as reversed())
+        """
+        return reversed(self)
+
+    def pre_order(self):
+        """
+        Names in pre-order: each person before their sub-trees
+        """
+        for node in self._traverse_pre_order(self.root):
             yield node.name
-            yield from self._traverse_forward(node.right)
+
+    def post_order(self):
+        """
+        Names in post-order: each person after their sub-trees
+        """
+        for node in self._traverse_post_order(self.root):
+            yield node.name
+
+    def level_order(self):
+        """
+        Names one generation at a time, starting from the root
+        """
+        for node in self._traverse_level_order(self.root):
+            yield node.name
+
+
+class PersistentFamilyTree(FamilyTree):
+    """
+    Family Tree that is never modified once built (persistent tree).
+    insert(), delete(), rename(), change_birthday() and merge() leave the
+    tree as it was and return a new version. The new version copies only
+    the people on the path from the root to the change (path copying),
+    O(log n) new Person objects, and shares every other person with the
+    old version. No Person is ever modified after it is reachable from a
+    version, so any number of threads can read a version while another
+    thread builds the next ones, without locks:
+
+        family = PersistentFamilyTree('Federico', '07/10/1992')
+        family = family.insert('Luca', '02/05/1963')   # writer
+        for name in family.snapshot():                 # readers
+            print(name)
+
+    The birthday index is path copied the same way, so each version has
+    its own index and born_between() stays O(log n + k).
+    """
+    class BirthdayIndex(FamilyTree.BirthdayIndex):
+        """
+        Birthday index that is never modified once built: with_key() and
+        without_key() return a new index that copies only the entries on
+        the path to the change
+        """
+        def _clone(self):
+            index = type(self)()
+            index.root = self.root
+            index.size = self.size
+            return index
+
+        def _copy(self, entry):
+            copy = FamilyTree.BirthdayIndex.Entry(entry.key)
+            copy.left = entry.left
+            copy.right = entry.right
+            copy.height = entry.height
+            return copy
+
+        def with_key(self, key):
+            """
+            Return a new index with the (date, name) pair added
+            """
+            index = self._clone()
+            index.root = index._add(key, index.root)
+            return index
+
+        def without_key(self, key):
+            """
+            Return a new index without the (date, name) pair
+            """
+            index = self._clone()
+            index.root = index._remove(key, index.root)
+            return index
+
+        def add(self, key):
+            raise RuntimeError("Use with_key(): a persistent index is never modified")
+
+        def remove(self, key):
+            raise RuntimeError("Use without_key(): a persistent index is never modified")
+
+        def _add(self, key, entry):
+            if entry is None:
+                self.size += 1
+                return FamilyTree.BirthdayIndex.Entry(key)
+            entry = self._copy(entry)
+            if key < entry.key:
+                entry.left = self._add(key, entry.left)
+            elif key > entry.key:
+                entry.right = self._add(key, entry.right)
+            else:
+                return entry
+            return self._rebalance(entry)
+
+        def _remove(self, key, entry):
+            if entry is None:
+                return None
+            if entry.key == key and (entry.left is None or entry.right is None):
+                self.size -= 1
+                return entry.left if entry.left is not None else entry.right
+            entry = self._copy(entry)
+            # Same as BirthdayIndex._remove on the copy (the successor case
+            # only changes the key of the copy)
+            if key < entry.key:
+                entry.left = self._remove(key, entry.left)
+            elif key > entry.key:
+                entry.right = self._remove(key, entry.right)
+            else:
+                successor = entry.right
+                while successor.left is not None:
+                    successor = successor.left
+                entry.key = successor.key
+                entry.right = self._remove(successor.key, entry.right)
+            return self._rebalance(entry)
+
+        def _rotate_left(self, entry):
+            entry = self._copy(entry)
+            entry.right = self._copy(entry.right)
+            return super()._rotate_left(entry)
+
+        def _rotate_right(self, entry):
+            entry = self._copy(entry)
+            entry.left = self._copy(entry.left)
+            return super()._rotate_right(entry)
+
+    def __init__(self, name:str=None, birthday:str=None):
+        """
+        Initialize a new version with the first person of the tree.
+        If no name is provided the tree starts empty.
+        """
+        self.root = None
+        self.birthdays = PersistentFamilyTree.BirthdayIndex()
+        if name is not None:
+            self.root = FamilyTree.Person(name, birthday)
+            if self.root.born is not None:
+                self.birthdays = self.birthdays.with_key(self.root.born)
+
+    def _version(self, root, birthdays):
+        """
+        Return a new version with the given root and birthday index
+        """
+        version = type(self)()
+        version.root = root
+        version.birthdays = birthdays
+        return version
+
+    def _copy(self, node):
+        """
+        Return a copy of a person that can be modified, because no
+        version can see it yet
+        """
+        copy = FamilyTree.Person.__new__(FamilyTree.Person)
+        copy.name = node.name
+        copy.birthday = node.birthday
+        copy.born = node.born
+        copy.left = node.left
+        copy.right = node.right
+        copy.height = node.height
+        copy.size = node.size
+        copy.oldest = node.oldest
+        copy.youngest = node.youngest
+        return copy
+
+    def find(self, name:str):
+        """
+        Return the Person with the given name, or None. Unlike
+        FamilyTree.find it does not keep 'last_visited': a version is
+        shared by many threads and is never modified.
+        """
+        node = self.root
+        while node is not None:
+            if name < node.name:
+                node = node.left
+            elif name > node.name:
+                node = node.right
+            else:
+                return node
+        return None
+
+    def _observe(self, metrics, operation, args, result):
+        """
+        Extra metrics when the version is instrumented: the height of the tree
+        """
+        metrics.gauge('height', self._height(self.root))
+
+    def snapshot(self):
+        """
+        Return a version that will not change while it is read. Versions
+        are never modified, so this is the version itself: O(1), no copy.
+        """
+        return self
+
+    def insert(self, name:str, birthday:str):
+        """
+        Return a new version with the person added (or this version if
+        the name is already in the tree)
+        """
+        if self.find(name) is not None:
+            return self
+        person = FamilyTree.Person(name, birthday)
+        birthdays = self.birthdays if person.born is None else self.birthdays.with_key(person.born)
+        return self._version(self._insert(person, self.root), birthdays)
+
+    def _insert(self, person, node):
+        """
+        Same as FamilyTree._insert, but each person on the path is copied
+        before its child is changed
+        """
+        if node is None:
+            return person
+
+        node = self._copy(node)
+        if person.name < node.name:
+            node.left = self._insert(person, node.left)
+        else:
+            node.right = self._insert(person, node.right)
+        return self._rebalance(node)
+
+    def delete(self, name:str):
+        """
+        Return a new version without the person (or this version if the
+        name is not in the tree)
+        """
+        person = self.find(name)
+        if person is None:
+            return self
+        birthdays = self.birthdays if person.born is None else self.birthdays.without_key(person.born)
+        return self._version(self._delete(name, self.root), birthdays)
+
+    def _delete(self, name:str, node):
+        """
+        Same as FamilyTree._delete, with path copying. The person taking
+        the place of a deleted person with two children is copied too.
+        """
+        if name < node.name:
+            node = self._copy(node)
+            node.left = self._delete(name, node.left)
+        elif name > node.name:
+            node = self._copy(node)
+            node.right = self._delete(name, node.right)
+        elif node.left is None or node.right is None:
+            return node.left if node.left is not None else node.right
+        else:
+            successor = node.right
+            while successor.left is not None:
+                successor = successor.left
+            right = self._delete(successor.name, node.right)
+            left = node.left
+            node = self._copy(successor)
+            node.left = left
+            node.right = right
+
+        return self._rebalance(node)
+
+    def _rotate_left(self, node):
+        """
+        Rotations change the node and its right child: both are copied,
+        because on a delete they can be shared with older versions
+        """
+        node = self._copy(node)
+        node.right = self._copy(node.right)
+        return super()._rotate_left(node)
+
+    def _rotate_right(self, node):
+        """
+        Mirror image of _rotate_left
+        """
+        node = self._copy(node)
+        node.left = self._copy(node.left)
+        return super()._rotate_right(node)
+
+    def rename(self, old:str, new:str):
+        """
+        Return a new version where the person 'old' is called 'new' (or
+        this version if 'old' is not in the tree or 'new' is already used)
+        """
+        person = self.find(old)
+        if person is None or self.find(new) is not None:
+            return self
+        return self.delete(old).insert(new, person.birthday)
+
+    def change_birthday(self, name:str, birthday:str):
+        """
+        Return a new version where the person has a new birthday
+        """
+        if self.find(name) is None:
+            return self
+        return self.delete(name).insert(name, birthday)
+
+    def merge(self, other):
+        """
+        Return a new version with the people of both trees (this tree's
+        person is kept when a name is in both). Like FamilyTree.merge it
+        is O(n + m), but every person is copied.
+        """
+        mine = ((person.name, 0, person) for person in self._traverse_forward(self.root))
+        theirs = ((person.name, 1, person) for person in other._traverse_forward(other.root))
+        return type(self).from_sorted((name, person.birthday) for name, _, person in heapq.merge(mine, theirs))
 
 
 # Test cases
-family_tree = FamilyTree('Federico', '07/10/1992')
-family_tree.insert('Luca', '02/05/1963')
-family_tree.insert('Livia', '12/04/1963')
-family_tree.insert('Carlo', '02/05/1963')
-family_tree.insert('Rita', '12/04/1963')
-family_tree.insert('Alessandra', '02/05/1963')
-family_tree.insert('Luciano', '12/04/1963')
-
-print(family_tree.get_generations())
-for person in family_tree:
-    print(person)
\ No newline at end of file
+if __name__ == "__main__":
+    family_tree = FamilyTree('Federico', '07/10/1992')
+    family_tree.insert('Luca', '02/05/1963')
+    family_tree.insert('Livia', '12/04/1963')
+    family_tree.insert('Carlo', '02/05/1963')
+    family_tree.insert('Rita', '12/04/1963')
+    family_tree.insert('Alessandra', '02/05/1963')
+    family_tree.insert('Luciano', '12/04/1963')
+
+    print(family_tree.get_generations())
+    for person in family_tree:
+        print(person)
+
+    family_tree.rename('Luca', 'Luigi')
+    family_tree.delete('Carlo')
+    print(family_tree.oldest(), family_tree.youngest())
+    print(list(family_tree))
+
+    versions = [PersistentFamilyTree('Federico', '07/10/1992')]
+    versions.append(versions[-1].insert('Luca', '02/05/1963'))
+    versions.append(versions[-1].insert('Livia', '12/04/1963'))
+    for version in versions:
+        print(list(version.snapshot()))
@@ -1,13 +1,31 @@
+import heapq
+import queue
+import sys
+import threading
+import time
+from collections import deque
+
+from rendering import Renderable
+
 # Initialize the Printer class
-class Printer():
+class Printer(Renderable):
     """
     The Printer class allow users to enter a queue to print a document.
     It is implemented following the FIFO method to process the requests.
     """
+    render_trailing = True  # str() gives "[doc1, doc2, ]"
+    instrumented_operations = ('enqueue_document', 'enqueue_many', 'drain', 'dequeue_documents')
+
     class Node():
         """
         Each Node in the queue will have a value (the document to print) assigned to it and the user who sent the document.
         """
+        # __slots__ stores the fields in fixed places instead of a per-instance
+        # __dict__, which saves memory when there are millions of nodes. The
+        # node classes of the other structures (Flight, LinkedList.Node, Tweet,
+        # Person) do the same.
+        __slots__ = ('value', 'user')
+
         def __init__(self, document, user):
             self.value = document
             self.user = user
@@ -18,18 +36,66 @@ class Printer():
             """
             return "Document: {} sent from {}".format(self.value, self.user)
 
-    def __init__(self):
+    def __init__(self, capacity=8):
         """
-        Initialize an empty queue
+        Initialize an empty queue. The queue is stored in a circular buffer
+        (a fixed size list that wraps around) so removing from the front
+        does not need to shift all the other documents.
         """
-        self.queue = []
+        self.queue = [None] * max(1, capacity)
+        self.front = 0  # Index of the first document in the buffer
+        self.size = 0   # Number of documents currently in the queue
+
+    def _grow(self):
+        """
+        Double the capacity of the buffer. The documents are copied in
+        order so that the front of the queue is at index 0 again.
+        """
+        capacity = len(self.queue)
+        new_queue = [None] * (capacity * 2)
+        for i in range(self.size):
+            new_queue[i] = self.queue[(self.front + i) % capacity]
+        self.queue = new_queue
+        self.front = 0
 
     def enqueue_document(self, value, user):
         """
         Add a new Node at the back of the queue with a value and a user.attached. The Node will always be added at the back of the queue.
         """
+        if self.size == len(self.queue):
+            self._grow()
         new_node = Printer.Node(value, user)
-        self.queue.append(new_node)
+        self.queue[(self.front + self.size) % len(self.queue)] = new_node
+        self.size += 1
+
+    def enqueue_many(self, documents):
+        """
+        Add several documents at once. 'documents' is any iterable of
+        (document, user) pairs, added in order at the back of the queue.
+        """
+        for value, user in documents:
+            self.enqueue_document(value, user)
+
+    def _dequeue(self):
+        """
+        Remove and return the Node at the front of the queue in O(1).
+        """
+        node = self.queue[self.front]
+        self.queue[self.front] = None  # Release the reference
+        self.front = (self.front + 1) % len(self.queue)
+        self.size -= 1
+        return node
+
+    def drain(self, max_items=None):
+        """
+        Generator that removes documents from the front of the queue and
+        gives them back one at a time. If max_items is provided, stop
+        after that many documents even if the queue is not empty.
+        """
+        count = 0
+        while self.size != 0 and (max_items is None or count < max_items):
+            yield self._dequeue()
+            count += 1
 
     def dequeue_documents(self):
         """
@@ -37,39 +103,377 @@ class Printer():
         Print all the documents until the queue is empty
         """
         # Check if the queue is empty
-        if len(self.queue) == 0:
+        if len(self) == 0:
             print("There are no documents in the printer queue")
             return None
 
-        while len(self.queue) != 0:
-            item_to_print = self.queue.pop(0)
+        for item_to_print in self.drain():
             print(f"\nPrinting item {item_to_print.value} from user {item_to_print.user}")
             print("Printing complete... Ready to print next item")
 
-        if len(self.queue) == 0:
+        if len(self) == 0:
             print("\nPrinting complete. The queue is empty.")
 
     def __len__(self):
         """
         Support the len() function
         """
-        return len(self.queue)
+        return self.size
+
+    def __iter__(self):
+        """
+        Iterate through the documents from the front to the back of the queue
+        """
+        capacity = len(self.queue)
+        for i in range(self.size):
+            yield self.queue[(self.front + i) % capacity]
+
+    def __reversed__(self):
+        """
+        Iterate through the documents from the back to the front of the queue
+        """
+        capacity = len(self.queue)
+        for i in range(self.size - 1, -1, -1):
+            yield self.queue[(self.front + i) % capacity]
+
+class FairPrinter(Renderable):
+    """
+    Printer queue that shares the printer fairly between users instead of
+    using strict FIFO. Each user has their own FIFO sub-queue and the users
+    with documents waiting take turns (weighted round-robin): a user with
+    weight w prints up to w documents before the next user's turn, so one
+    user sending thousands of documents cannot make everyone else wait.
+
+    Documents can also have a priority. Documents with a higher priority
+    are always printed first; users take turns inside the same priority.
+    Choosing the next document is O(1), plus O(log P) for the P different
+    priorities in use.
+    """
+    render_trailing = True  # str() gives "[doc1, doc2, ]"
+    instrumented_operations = ('enqueue_document', 'enqueue_many', 'drain', 'dequeue_documents')
+
+    class Level():
+        """
+        All the documents with the same priority: one sub-queue per user
+        and the ring of users taking turns
+        """
+        __slots__ = ('queues', 'turns', 'credit')
+
+        def __init__(self):
+            self.queues = {}      # user -> deque of (Node, time added)
+            self.turns = deque()  # Users with documents, the first one is printing
+            self.credit = 0       # Documents the first user can still print this turn
+
+    def __init__(self, samples=1000):
+        """
+        Initialize an empty queue. For each user the last 'samples' wait
+        times are kept to compute percentiles.
+        """
+        self.levels = {}      # priority -> Level
+        self.priorities = []  # Heap of the priorities in use (negated, highest first)
+        self.weights = {}
+        self.waits = {}       # user -> deque of the recent wait times in seconds
+        self.samples = samples
+        self.size = 0
+
+    def set_weight(self, user, weight:int):
+        """
+        Let 'user' print 'weight' documents in a row on each turn (default 1)
+        """
+        if weight < 1:
+            raise ValueError("The weight must be at least 1")
+        self.weights[user] = weight
+
+    def enqueue_document(self, value, user, priority:int=0):
+        """
+        Add a new Node at the back of the user's sub-queue
+        """
+        level = self.levels.get(priority)
+        if level is None:
+            level = self.levels[priority] = FairPrinter.Level()
+            heapq.heappush(self.priorities, -priority)
+
+        user_queue = level.queues.get(user)
+        if user_queue is None:
+            # The user joins the ring of users taking turns
+            user_queue = level.queues[user] = deque()
+            level.turns.append(user)
+            if len(level.turns) == 1:
+                level.credit = self.weights.get(user, 1)
+        user_queue.append((Printer.Node(value, user), time.monotonic()))
+        self.size += 1
+
+    def enqueue_many(self, documents):
+        """
+        Add several (document, user) pairs at once
+        """
+        for value, user in documents:
+            self.enqueue_document(value, user)
+
+    def _dequeue(self):
+        """
+        Remove and return the next Node to print
+        """
+        priority = -self.priorities[0]
+        level = self.levels[priority]
+        user = level.turns[0]
+        user_queue = level.queues[user]
+        node, added = user_queue.popleft()
+        level.credit -= 1
+
+        if not user_queue:
+            # The user has nothing left: leave the ring, the next user is now first
+            del level.queues[user]
+            level.turns.popleft()
+            if level.turns:
+                level.credit = self.weights.get(level.turns[0], 1)
+        elif level.credit == 0:
+            # Turn used up: the user goes to the back of the ring
+            level.turns.rotate(-1)
+            level.credit = self.weights.get(level.turns[0], 1)
+        if not level.turns:
+            del self.levels[priority]
+            heapq.heappop(self.priorities)
+
+        waits = self.waits.get(user)
+        if waits is None:
+            waits = self.waits[user] = deque(maxlen=self.samples)
+        waits.append(time.monotonic() - added)
+        self.size -= 1
+        return node
+
+    def drain(self, max_items=None):
+        """
+        Generator that removes documents in fair order and gives them back
+        one at a time. If max_items is provided, stop after that many.
+        """
+        count = 0
+        while self.size != 0 and (max_items is None or count < max_items):
+            yield self._dequeue()
+            count += 1
+
+    def dequeue_documents(self):
+        """
+        Print all the documents until the queue is empty
+        """
+        if len(self) == 0:
+            print("There are no documents in the printer queue")
+            return None
+
+        for item_to_print in self.drain():
+            print(f"\nPrinting item {item_to_print.value} from user {item_to_print.user}")
+            print("Printing complete... Ready to print next item")
+
+        print("\nPrinting complete. The queue is empty.")
+
+    def wait_percentiles(self, user, percentiles=(50, 90, 99)):
+        """
+        Return a dictionary percentile -> seconds waited by the recent
+        documents of the user (nearest-rank method), or an empty dictionary
+        if no document of the user has been printed yet.
+        """
+        waits = sorted(self.waits.get(user, ()))
+        if not waits:
+            return {}
+        result = {}
+        for percentile in percentiles:
+            rank = max(1, -(-percentile * len(waits) // 100))  # Round up
+            result[percentile] = waits[min(rank, len(waits)) - 1]
+        return result
+
+    def __len__(self):
+        """
+        Support the len() function
+        """
+        return self.size
+
+    def __iter__(self):
+        """
+        Iterate through the waiting documents grouped by priority (highest
+        first) and by user in the order of their turns
+        """
+        for priority in sorted(self.levels, reverse=True):
+            level = self.levels[priority]
+            for user in level.turns:
+                for node, _ in level.queues[user]:
+                    yield node
+
+    def __reversed__(self):
+        """
+        Iterate through the waiting documents in the opposite order of __iter__
+        """
+        for priority in sorted(self.levels):
+            level = self.levels[priority]
+            for user in reversed(level.turns):
+                for node, _ in reversed(level.queues[user]):
+                    yield node
+
+
+def print_document(node):
+    """
+    Default printer sink: "print" the document by showing it on the screen
+    """
+    print(f"\nPrinting item {node.value} from user {node.user}")
+
+
+def report_error(node, error):
+    """
+    Default error handler: show which document failed and why
+    """
+    print(f"Printing item {node.value} from user {node.user} failed: {error!r}", file=sys.stderr)
+
+
+class PrinterSpooler():
+    """
+    Printer queue shared by several threads. Any number of producers can
+    call enqueue_document() at the same time, and 'workers' threads take
+    the documents in FIFO order and send them to a sink. A sink is any
+    function that receives a Printer.Node, for example a function that
+    talks to a real printer.
+
+    If max_depth is provided, enqueue_document() waits while the queue
+    already holds max_depth documents (back-pressure), so fast producers
+    cannot make the queue grow without limit.
+
+    If the sink raises an exception, on_error(node, exception) is called
+    and the worker goes on with the next document, so one failing document
+    does not stop the printing (or make join() wait forever).
+    """
+    _STOP = object()  # Tells a worker to finish
+
+    def __init__(self, sink=print_document, workers=1, max_depth=None, on_error=report_error):
+        """
+        Create the queue and start the worker threads
+        """
+        # queue.Queue is a deque protected by a lock, safe between threads
+        self.queue = queue.Queue(maxsize=max_depth or 0)
+        self.sink = sink
+        self.on_error = on_error
+        self.workers = [threading.Thread(target=self._work, daemon=True) for _ in range(workers)]
+        for worker in self.workers:
+            worker.start()
+
+    def enqueue_document(self, value, user, timeout=None):
+        """
+        Add a new document at the back of the queue. If the queue is full,
+        wait for a free spot (up to 'timeout' seconds, then queue.Full is raised).
+        """
+        self.queue.put(Printer.Node(value, user), timeout=timeout)
+
+    def _work(self):
+        """
+        Worker loop: send documents to the sink until told to stop
+        """
+        while True:
+            node = self.queue.get()
+            try:
+                if node is PrinterSpooler._STOP:
+                    return
+                try:
+                    self.sink(node)
+                except Exception as error:
+                    self.on_error(node, error)
+            finally:
+                self.queue.task_done()
+
+    def join(self):
+        """
+        Wait until every document added so far has been printed
+        """
+        self.queue.join()
+
+    def close(self):
+        """
+        Print the documents still in the queue, then stop the workers
+        """
+        for _ in self.workers:
+            self.queue.put(PrinterSpooler._STOP)
+        for worker in self.workers:
+            worker.join()
+
+    def __len__(self):
+        """
+        Support the len() function (documents waiting to be printed)
+        """
+        return self.queue.qsize()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class AsyncPrinter():
+    """
+    Printer queue for asyncio programs. Documents are added with
+    'await printer.enqueue_document(...)', which waits when the queue
+    already holds max_depth documents, and consumed with:
+
+    async for node in printer:
+        ...
+
+    Several tasks can consume the same printer. After close() the
+    consumers finish the documents left in the queue and then stop.
+    """
+    _STOP = object()  # Marks the end of the queue
+
+    def __init__(self, max_depth=None):
+        """
+        Initialize an empty queue
+        """
+        import asyncio  # Imported here because it is slow to import and only needed by this class
+        self.queue = asyncio.Queue(maxsize=max_depth or 0)
+
+    async def enqueue_document(self, value, user):
+        """
+        Add a new document at the back of the queue
+        """
+        await self.queue.put(Printer.Node(value, user))
+
+    async def close(self):
+        """
+        Tell the consumers that no more documents will be added
+        """
+        await self.queue.put(AsyncPrinter._STOP)
+
+    async def run_workers(self, sink, workers=1):
+        """
+        Consume the queue with 'workers' tasks until close() is called. The
+        sink is an async function that receives a Printer.Node.
+        """
+        async def work():
+            async for node in self:
+                await sink(node)
+
+        import asyncio
+        await asyncio.gather(*(work() for _ in range(workers)))
+
+    def __len__(self):
+        """
+        Support the len() function (documents waiting to be printed)
+        """
+        return self.queue.qsize()
+
+    def __aiter__(self):
+        return self
 
-    def __str__(self):
+    async def __anext__(self):
         """
-        Suppport the str() function to provide a string representation of the queue.
+        Give the next document, or stop the iteration after close()
         """
-        string = "["
-        for node in self.queue:
-            string += str(node)  # This uses the __str__ from the Node class
-            string += ", "
-        string += "]"
-        return string
+        node = await self.queue.get()
+        if node is AsyncPrinter._STOP:
+            # Put the marker back so the other consumers stop too
+            self.queue.put_nowait(AsyncPrinter._STOP)
+            raise StopAsyncIteration
+        return node
 
 # Test cases
-printer_queue = Printer() # Create the Printer object
-printer_queue.enqueue_document('text1.txt', 'Anne') # Add a document to the queue
-printer_queue.enqueue_document('text2.txt', 'Bob')  # Add a document to the queue
-printer_queue.enqueue_document('text3.txt', 'Charlie')  # Add a document to the queue
-print(printer_queue) # [Document: text1.txt sent from Anne, Document: text2.txt sent from Bob, Document: text3.txt sent from Charlie, ]
-printer_queue.dequeue_documents() # Print all the documents in the queue
\ No newline at end of file
+if __name__ == "__main__":
+    printer_queue = Printer() # Create the Printer object
+    printer_queue.enqueue_document('text1.txt', 'Anne') # Add a document to the queue
+    printer_queue.enqueue_document('text2.txt', 'Bob')  # Add a document to the queue
+    printer_queue.enqueue_document('text3.txt', 'Charlie')  # Add a document to the queue
+    print(printer_queue) # [Document: text1.txt sent from Anne, Document: text2.txt sent from Bob, Document: text3.txt sent from Charlie, ]
+    printer_queue.dequeue_documents() # Print all the documents in the queue
@@ -0,0 +1,68 @@
+"""
+Shared string representation for the containers of this tutorial.
+"""
+import io
+from itertools import islice
+
+
+class Renderable():
+    """
+    Mixin that gives a container its str() and repr(). The container must
+    support iteration, reversed() and len(). Each item is shown with str().
+
+    - write_to(stream) writes the items to a stream a chunk at a time, so
+      the whole text never has to be in memory.
+    - str() uses write_to() on an in-memory buffer, which takes linear
+      time (adding strings together with += in a loop can be quadratic).
+    - repr() only shows the first and last few items and the count, so
+      it is cheap even for a huge container (good for log lines).
+    """
+    render_open = "["        # Written before the items
+    render_close = "]"       # Written after the items
+    render_separator = ", "  # Written between the items
+    render_trailing = False  # If True the separator is also written after the last item
+    render_chunk = 1024      # Number of items joined for each stream.write()
+    preview_items = 3        # Number of items shown at each end by repr()
+
+    def write_to(self, stream):
+        """
+        Write the string representation of the container to a text stream
+        (a file, sys.stdout, io.StringIO, ...).
+        """
+        stream.write(self.render_open)
+        items = (str(item) for item in self)
+        first = True
+        while True:
+            chunk = list(islice(items, self.render_chunk))
+            if not chunk:
+                break
+            if not first:
+                stream.write(self.render_separator)
+            first = False
+            stream.write(self.render_separator.join(chunk))
+        if self.render_trailing and not first:
+            stream.write(self.render_separator)
+        stream.write(self.render_close)
+
+    def __str__(self):
+        """
+        Suppport the str() function to provide a string representation of the container.
+        """
+        buffer = io.StringIO()
+        self.write_to(buffer)
+        return buffer.getvalue()
+
+    def __repr__(self):
+        """
+        Short representation with the first and last items and the count
+        """
+        size = len(self)
+        k = self.preview_items
+        if size <= 2 * k:
+            items = [str(item) for item in self]
+        else:
+            last = [str(item) for item in islice(reversed(self), k)]
+            items = [str(item) for item in islice(self, k)] + ["..."] + last[::-1]
+        return "<{} of {} items: {}{}{}>".format(
+            type(self).__qualname__, size, self.render_open,
+            self.render_separator.join(items), self.render_close)
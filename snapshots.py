@@ -0,0 +1,409 @@
+"""
+Binary snapshots of FamilyTree, Printer and Airport_Departures.
+
+A snapshot is written in one pass over the structure and read back with
+mmap, so opening it is instant whatever its size: nothing is read until a
+query needs it. Read-only queries (find, rank, iteration, ...) run directly
+on the mapped file, and to_tree()/to_printer()/to_airport() rebuild the
+normal in-memory structure when it has to be modified again.
+
+File layout (all integers little endian):
+
+    header   magic 'DSSN', version, kind, number of records, start of the strings
+    records  one fixed width record per node, numbered from 0
+    strings  each string is a 4 byte length followed by its UTF-8 bytes
+
+Records refer to their strings by offset inside the strings region and to
+other nodes by record number (-1 for None).
+
+    tree     name, birthday, left child, right child, height, size
+             (pre-order, so the root is record 0)
+    printer  document, user (FIFO order, the next node is the next record)
+    airport  code, departure in minutes since 1970 (sorted by departure)
+"""
+import mmap
+import os
+import struct
+
+from problem_queues_solution import Airport_Departures, parse_departure
+from problem_trees_solution import FamilyTree
+from queues_example import Printer
+
+MAGIC = b'DSSN'
+VERSION = 1
+TREE, PRINTER, AIRPORT = 1, 2, 3
+
+HEADER = struct.Struct('<4sHHQQ')
+LENGTH = struct.Struct('<I')
+RECORDS = {
+    TREE: struct.Struct('<QQqqQQ'),
+    PRINTER: struct.Struct('<QQ'),
+    AIRPORT: struct.Struct('<Qq'),
+}
+NO_STRING = 2**64 - 1  # Offset used for a missing (None) string
+NONE = -1              # Record number used for a missing node
+
+
+def _write(path, kind, count, rows):
+    """
+    Write a snapshot of 'count' records. 'rows' gives the fields of each
+    record, with str (or None) for the strings and int for the rest.
+
+    The size of the records region is known from 'count', so the strings
+    region starts at a known place: the file is opened twice and the
+    records and the strings are written side by side in a single pass.
+
+    The snapshot is written to a temporary file that replaces 'path' only
+    when it is complete (os.replace is atomic), so a failure or a crash
+    in the middle leaves the previous snapshot untouched.
+    """
+    temporary = path + '.tmp'
+    try:
+        _write_records(temporary, kind, count, rows)
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+def _write_records(path, kind, count, rows):
+    """
+    Write the header, the records and the strings of a snapshot to 'path'
+    """
+    record = RECORDS[kind]
+    strings_start = HEADER.size + count * record.size
+    written = 0
+    with open(path, 'wb') as records, open(path, 'r+b') as strings:
+        records.write(HEADER.pack(MAGIC, VERSION, kind, count, strings_start))
+        strings.seek(strings_start)
+        position = 0  # Offset of the next string inside the strings region
+        for row in rows:
+            fields = []
+            for field in row:
+                if field is None:
+                    fields.append(NO_STRING)
+                elif isinstance(field, str):
+                    data = field.encode('utf-8')
+                    strings.write(LENGTH.pack(len(data)))
+                    strings.write(data)
+                    fields.append(position)
+                    position += LENGTH.size + len(data)
+                else:
+                    fields.append(field)
+            records.write(record.pack(*fields))
+            written += 1
+        records.flush()
+        strings.flush()
+        os.fsync(records.fileno())  # On disk before it replaces the old snapshot
+    if written != count:
+        raise RuntimeError("The structure changed while the snapshot was written")
+
+
+def _text(value, what):
+    """
+    Check that a value stored as a string in a snapshot is a string
+    """
+    if value is not None and not isinstance(value, str):
+        raise TypeError(f"Only strings can be saved as {what}, not {type(value).__name__}")
+    return value
+
+
+def save_family_tree(tree, path):
+    """
+    Write a snapshot of a FamilyTree. The people are written in pre-order;
+    the size stored in each Person gives the record number of its children
+    without a second pass (left child = next record, right child = after
+    the whole left sub-tree).
+    """
+    def rows():
+        for index, node in enumerate(tree._traverse_pre_order(tree.root)):
+            left = index + 1 if node.left is not None else NONE
+            right = index + 1 + tree._size(node.left) if node.right is not None else NONE
+            yield (_text(node.name, 'names'), _text(node.birthday, 'birthdays'),
+                   left, right, node.height, node.size)
+
+    _write(path, TREE, len(tree), rows())
+
+
+def save_printer(printer, path):
+    """
+    Write a snapshot of a Printer queue (documents and users must be strings)
+    """
+    rows = ((_text(node.value, 'documents'), _text(node.user, 'users')) for node in printer)
+    _write(path, PRINTER, len(printer), rows)
+
+
+def save_airport(airport, path):
+    """
+    Write a snapshot of an Airport_Departures queue sorted by departure
+    """
+    entries = sorted(entry for entry in airport.flights.values())
+    rows = ((_text(flight.code, 'flight codes'), flight.departure) for _, _, flight in entries)
+    _write(path, AIRPORT, len(entries), rows)
+
+
+class Snapshot():
+    """
+    Read-only view of a snapshot file through mmap
+    """
+    kind = None
+
+    def __init__(self, path):
+        """
+        Map the file and check its header
+        """
+        with open(path, 'rb') as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, kind, self.count, self.strings_start = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a snapshot file")
+        if kind != self.kind:
+            self.close()
+            raise ValueError(f"{path} does not contain a {type(self).__name__[:-len('Snapshot')]}")
+        self.record = RECORDS[kind]
+
+    def _record(self, index):
+        """
+        Return the fields of record number 'index'
+        """
+        return self.record.unpack_from(self.map, HEADER.size + index * self.record.size)
+
+    def _string(self, offset):
+        """
+        Return the string stored at 'offset' in the strings region
+        """
+        if offset == NO_STRING:
+            return None
+        start = self.strings_start + offset
+        (length,) = LENGTH.unpack_from(self.map, start)
+        start += LENGTH.size
+        return self.map[start:start + length].decode('utf-8')
+
+    def close(self):
+        """
+        Release the mapped file
+        """
+        self.map.close()
+
+    def __len__(self):
+        """
+        Support the len() function
+        """
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class FamilyTreeSnapshot(Snapshot):
+    """
+    Read-only FamilyTree stored in a snapshot file. People are only read
+    from the file (and turned into Person objects) when a query reaches them.
+    """
+    kind = TREE
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.people = {}  # Record number -> Person already read
+
+    def _name(self, index):
+        return self._string(self._record(index)[0])
+
+    def person(self, index):
+        """
+        Return the Person stored in record number 'index'. Its left and
+        right pointers are not set: the tree structure stays in the file.
+        """
+        person = self.people.get(index)
+        if person is None:
+            name, birthday, _, _, height, size = self._record(index)
+            person = FamilyTree.Person(self._string(name), self._string(birthday))
+            person.height = height
+            person.size = size
+            self.people[index] = person
+        return person
+
+    def _size(self, index):
+        return 0 if index == NONE else self._record(index)[5]
+
+    def get_generations(self):
+        """
+        Height of the tree, stored in the root record
+        """
+        return 0 if self.count == 0 else self._record(0)[4]
+
+    def find(self, name:str):
+        """
+        Return the Person with the given name, or None
+        """
+        index = 0 if self.count else NONE
+        while index != NONE:
+            name_offset, _, left, right, _, _ = self._record(index)
+            current = self._string(name_offset)
+            if name < current:
+                index = left
+            elif name > current:
+                index = right
+            else:
+                return self.person(index)
+        return None
+
+    def __contains__(self, name):
+        return self.find(name) is not None
+
+    def rank(self, name:str):
+        """
+        Number of people whose name is smaller than 'name'
+        """
+        count = 0
+        index = 0 if self.count else NONE
+        while index != NONE:
+            name_offset, _, left, right, _, _ = self._record(index)
+            if name <= self._string(name_offset):
+                index = left
+            else:
+                count += self._size(left) + 1
+                index = right
+        return count
+
+    def select(self, k:int):
+        """
+        Name at position k (starting from 0) in sorted order
+        """
+        if k < 0 or k >= self.count:
+            raise IndexError("FamilyTree index out of range")
+        index = 0
+        while True:
+            name_offset, _, left, right, _, _ = self._record(index)
+            left_size = self._size(left)
+            if k < left_size:
+                index = left
+            elif k > left_size:
+                k -= left_size + 1
+                index = right
+            else:
+                return self._string(name_offset)
+
+    def _in_order(self):
+        """
+        Give the record numbers in sorted order (explicit stack)
+        """
+        stack = []
+        index = 0 if self.count else NONE
+        while stack or index != NONE:
+            if index != NONE:
+                stack.append(index)
+                index = self._record(index)[2]
+            else:
+                index = stack.pop()
+                yield index
+                index = self._record(index)[3]
+
+    def __iter__(self):
+        """
+        Names in sorted order
+        """
+        for index in self._in_order():
+            yield self._name(index)
+
+    def to_tree(self):
+        """
+        Build a normal (modifiable) FamilyTree with the same people
+        """
+        return FamilyTree.from_sorted(
+            (person.name, person.birthday) for person in (self.person(index) for index in self._in_order()))
+
+
+class PrinterSnapshot(Snapshot):
+    """
+    Read-only Printer queue stored in a snapshot file
+    """
+    kind = PRINTER
+
+    def __iter__(self):
+        """
+        Documents from the front to the back of the queue
+        """
+        for index in range(self.count):
+            document, user = self._record(index)
+            yield Printer.Node(self._string(document), self._string(user))
+
+    def to_printer(self):
+        """
+        Build a normal Printer with the same documents
+        """
+        printer = Printer(capacity=self.count)
+        printer.enqueue_many((node.value, node.user) for node in self)
+        return printer
+
+
+class AirportSnapshot(Snapshot):
+    """
+    Read-only Airport_Departures queue stored in a snapshot file
+    """
+    kind = AIRPORT
+
+    def _flight(self, index):
+        code, departure = self._record(index)
+        return Airport_Departures.Flight(self._string(code), departure)
+
+    def __iter__(self):
+        """
+        Flights from the earliest to the latest departure
+        """
+        for index in range(self.count):
+            yield self._flight(index)
+
+    def departures_between(self, start:str, end:str):
+        """
+        Give the flights leaving between start and end (both included).
+        The records are sorted by departure, so a binary search finds the
+        first one.
+        """
+        start = parse_departure(start)
+        end = parse_departure(end)
+        first, last = 0, self.count
+        while first < last:
+            middle = (first + last) // 2
+            if self._record(middle)[1] < start:
+                first = middle + 1
+            else:
+                last = middle
+        for index in range(first, self.count):
+            flight = self._flight(index)
+            if flight.departure > end:
+                return
+            yield flight
+
+    def to_airport(self):
+        """
+        Build a normal Airport_Departures with the same flights. Flights
+        that already left are kept. The records are sorted, and a sorted
+        list is already a valid heap, so no heapify is needed.
+        """
+        airport = Airport_Departures()
+        for flight in self:
+            entry = [flight.departure, next(airport.counter), flight]
+            airport.flights[flight.code] = entry
+            airport.queue.append(entry)
+        return airport
+
+
+def load(path):
+    """
+    Open a snapshot file of any kind and return its read-only view
+    """
+    with open(path, 'rb') as file:
+        header = file.read(HEADER.size)
+    if len(header) < HEADER.size:
+        raise ValueError(f"{path} is not a snapshot file")
+    kind = HEADER.unpack(header)[2]
+    views = {TREE: FamilyTreeSnapshot, PRINTER: PrinterSnapshot, AIRPORT: AirportSnapshot}
+    if kind not in views:
+        raise ValueError(f"{path} is not a snapshot file")
+    return views[kind](path)